@@ -0,0 +1,41 @@
+"""Durable webhook inbox claimed by background workers
+
+Revision ID: 002
+Revises: 001
+Create Date: 2025-02-01 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "webhook_inbox",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, primary_key=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+    )
+    # Partial index: workers only ever scan pending/processing rows
+    op.create_index(
+        "ix_webhook_inbox_claim",
+        "webhook_inbox",
+        ["status", "next_attempt_at"],
+        unique=False,
+        postgresql_where=sa.text("status <> 'dead'"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_webhook_inbox_claim", table_name="webhook_inbox")
+    op.drop_table("webhook_inbox")
@@ -0,0 +1,25 @@
+"""WhatsApp message id on messages with a unique index for idempotent inbound processing
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-02-05 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("messages", sa.Column("wa_message_id", sa.String(128), nullable=True))
+    # NULLs never conflict, so existing rows and messages without a wamid are unaffected
+    op.create_index("ix_messages_wa_message_id", "messages", ["wa_message_id"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_messages_wa_message_id", table_name="messages")
+    op.drop_column("messages", "wa_message_id")
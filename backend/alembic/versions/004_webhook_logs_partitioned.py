@@ -0,0 +1,71 @@
+"""Compressed, indexed webhook_logs partitioned by day
+
+The old table is kept as webhook_logs_legacy (uncompressed, unpartitioned) so existing
+payloads stay readable; drop it once it is no longer needed.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-02-10 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+# Partitions created up front; services/log_retention.py keeps creating ahead and dropping old ones
+INITIAL_DAYS_AHEAD = 7
+
+
+def upgrade():
+    op.rename_table("webhook_logs", "webhook_logs_legacy")
+    op.execute("ALTER INDEX ix_webhook_logs_phone_number_id RENAME TO ix_webhook_logs_legacy_phone_number_id")
+
+    op.create_table(
+        "webhook_logs",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        # UTC like the app and log_retention, so rows land in the partition for their UTC day
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("(now() at time zone 'utc')"), nullable=False),
+        sa.Column("payload_gz", sa.LargeBinary(), nullable=True),
+        sa.Column("direction", sa.String(16), nullable=True),
+        sa.Column("phone_number_id", sa.String(64), nullable=True),
+        sa.Column("wamid", sa.String(128), nullable=True),
+        sa.Column("wa_from", sa.String(32), nullable=True),
+        sa.Column("event_status", sa.String(16), nullable=True),
+        sa.Column("status", sa.String(32), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        # Partition key must be part of the primary key
+        sa.PrimaryKeyConstraint("id", "created_at"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index("ix_webhook_logs_created_at", "webhook_logs", ["created_at"], unique=False)
+    op.create_index("ix_webhook_logs_phone_number_id", "webhook_logs", ["phone_number_id"], unique=False)
+    op.create_index("ix_webhook_logs_wamid", "webhook_logs", ["wamid"], unique=False)
+    op.create_index("ix_webhook_logs_wa_from", "webhook_logs", ["wa_from"], unique=False)
+
+    # Catches rows outside every daily partition (e.g. if maintenance has not run for a while)
+    op.execute("CREATE TABLE webhook_logs_default PARTITION OF webhook_logs DEFAULT")
+    op.execute(
+        f"""
+        DO $$
+        DECLARE d date;
+        BEGIN
+            FOR i IN 0..{INITIAL_DAYS_AHEAD} LOOP
+                d := (now() at time zone 'utc')::date + i;
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF webhook_logs FOR VALUES FROM (%L) TO (%L)',
+                    'webhook_logs_p' || to_char(d, 'YYYYMMDD'), d, d + 1
+                );
+            END LOOP;
+        END $$;
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("webhook_logs")  # Drops all partitions with it
+    op.rename_table("webhook_logs_legacy", "webhook_logs")
+    op.execute("ALTER INDEX ix_webhook_logs_legacy_phone_number_id RENAME TO ix_webhook_logs_phone_number_id")
@@ -0,0 +1,26 @@
+"""Delivery status columns on messages for sent/delivered/read/failed callbacks
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-02-14 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("messages", sa.Column("delivery_status", sa.String(16), nullable=True))
+    op.add_column("messages", sa.Column("status_updated_at", sa.DateTime(), nullable=True))
+    op.add_column("messages", sa.Column("delivery_error", sa.Text(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("messages", "delivery_error")
+    op.drop_column("messages", "status_updated_at")
+    op.drop_column("messages", "delivery_status")
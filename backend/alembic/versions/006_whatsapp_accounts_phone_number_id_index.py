@@ -0,0 +1,21 @@
+"""Index whatsapp_accounts.phone_number_id (webhook routing lookups)
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-02-18 00:00:00
+
+"""
+from alembic import op
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_whatsapp_accounts_phone_number_id", "whatsapp_accounts", ["phone_number_id"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_whatsapp_accounts_phone_number_id", table_name="whatsapp_accounts")
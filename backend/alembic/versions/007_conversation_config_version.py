@@ -0,0 +1,22 @@
+"""Version stamp on conversation_configs for cache invalidation
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-02-20 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("conversation_configs", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    op.drop_column("conversation_configs", "version")
@@ -0,0 +1,50 @@
+"""Unique (user_id, wa_phone) on conversations
+
+Existing duplicates are merged first: messages and leads move to the oldest conversation
+of each (user_id, wa_phone) and the other rows are deleted.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-02-24 00:00:00
+
+"""
+from alembic import op
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+_DUPLICATES = """
+    WITH ranked AS (
+        SELECT id, first_value(id) OVER (
+            PARTITION BY user_id, wa_phone ORDER BY created_at, id
+        ) AS keep_id
+        FROM conversations
+    )
+    SELECT id, keep_id FROM ranked WHERE id <> keep_id
+"""
+
+
+def upgrade():
+    op.execute(f"CREATE TEMP TABLE conversation_duplicates ON COMMIT DROP AS {_DUPLICATES}")
+    op.execute(
+        "UPDATE messages m SET conversation_id = d.keep_id "
+        "FROM conversation_duplicates d WHERE m.conversation_id = d.id"
+    )
+    op.execute(
+        "UPDATE leads l SET conversation_id = d.keep_id "
+        "FROM conversation_duplicates d WHERE l.conversation_id = d.id"
+    )
+    op.execute("DELETE FROM conversations c USING conversation_duplicates d WHERE c.id = d.id")
+
+    op.create_index(
+        "ux_conversations_user_id_wa_phone", "conversations", ["user_id", "wa_phone"], unique=True
+    )
+    # Covered by the leading column of the unique index
+    op.drop_index("ix_conversations_user_id", table_name="conversations")
+
+
+def downgrade():
+    op.create_index("ix_conversations_user_id", "conversations", ["user_id"], unique=False)
+    op.drop_index("ux_conversations_user_id_wa_phone", table_name="conversations")
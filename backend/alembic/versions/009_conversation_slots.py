@@ -0,0 +1,23 @@
+"""Captured slot values (name, requirement, contact) on conversations
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-03-01 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("conversations", sa.Column("slots", postgresql.JSONB(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("conversations", "slots")
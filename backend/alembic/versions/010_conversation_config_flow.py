@@ -0,0 +1,23 @@
+"""Custom flow definition on conversation_configs
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-03-05 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("conversation_configs", sa.Column("flow", postgresql.JSONB(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("conversation_configs", "flow")
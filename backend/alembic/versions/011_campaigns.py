@@ -0,0 +1,60 @@
+"""Broadcast campaigns and per-recipient outcomes
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-03-12 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "campaigns",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("account_id", sa.String(36), sa.ForeignKey("whatsapp_accounts.id"), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("audience", sa.String(32), nullable=False),
+        sa.Column("audience_value", sa.String(64), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False, server_default="draft"),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sent", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_index("ix_campaigns_id", "campaigns", ["id"], unique=False)
+    op.create_index("ix_campaigns_user_id", "campaigns", ["user_id"], unique=False)
+
+    op.create_table(
+        "campaign_recipients",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, primary_key=True),
+        sa.Column("campaign_id", sa.String(36), sa.ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("wa_phone", sa.String(32), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("wa_message_id", sa.String(128), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("sent_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_index(
+        "ux_campaign_recipients_campaign_id_wa_phone",
+        "campaign_recipients",
+        ["campaign_id", "wa_phone"],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_table("campaign_recipients")
+    op.drop_table("campaigns")
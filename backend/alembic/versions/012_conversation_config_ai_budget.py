@@ -0,0 +1,27 @@
+"""AI reply latency budget and follow-up flag on conversation_configs
+
+Revision ID: 012
+Revises: 011
+Create Date: 2025-03-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "012"
+down_revision = "011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("conversation_configs", sa.Column("ai_reply_budget_ms", sa.Integer(), nullable=True))
+    op.add_column(
+        "conversation_configs",
+        sa.Column("ai_followup", sa.Boolean(), nullable=False, server_default="false"),
+    )
+
+
+def downgrade():
+    op.drop_column("conversation_configs", "ai_followup")
+    op.drop_column("conversation_configs", "ai_reply_budget_ms")
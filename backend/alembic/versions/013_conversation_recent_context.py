@@ -0,0 +1,23 @@
+"""Recent turns for AI prompts on conversations
+
+Revision ID: 013
+Revises: 012
+Create Date: 2025-03-24 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "013"
+down_revision = "012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("conversations", sa.Column("recent_context", postgresql.JSONB(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("conversations", "recent_context")
@@ -0,0 +1,33 @@
+"""Per-user FAQ entries
+
+Revision ID: 014
+Revises: 013
+Create Date: 2025-03-31 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "014"
+down_revision = "013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "faq_entries",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("question", sa.Text(), nullable=False),
+        sa.Column("answer", sa.Text(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False, server_default="true"),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_index("ix_faq_entries_id", "faq_entries", ["id"], unique=False)
+    op.create_index("ix_faq_entries_user_id", "faq_entries", ["user_id"], unique=False)
+
+
+def downgrade():
+    op.drop_table("faq_entries")
@@ -0,0 +1,29 @@
+"""Partial index on unread notifications
+
+Revision ID: 015
+Revises: 014
+Create Date: 2025-04-02 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "015"
+down_revision = "014"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Only unread rows are indexed: unread counts and bulk mark-read stay cheap however much history piles up
+    op.create_index(
+        "ix_notifications_unread",
+        "notifications",
+        ["user_id", "created_at"],
+        unique=False,
+        postgresql_where=sa.text("is_read = false"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_notifications_unread", table_name="notifications")
@@ -4,7 +4,8 @@ Admin: user management, assign WhatsApp tokens, usage, webhook logs, default tem
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
+from datetime import datetime
 import uuid
 
 from app.database import get_db
@@ -12,12 +13,30 @@ from app.models.message import Conversation
 from app.core.deps import get_current_admin
 from app.models.user import User, UserRole
 from app.models.whatsapp import WhatsAppAccount, WebhookLog
+from app.models.inbox import WebhookInbox, InboxStatus
 from app.models.lead import Lead
 from app.models.message import Message
 from app.models.conversation import ConversationConfig
 from app.schemas.user import UserResponse, UserCreate, UserUpdate
 from app.schemas.whatsapp import WhatsAppAccountResponse, WebhookLogResponse
 from app.core.security import get_password_hash
+from app.services.inbox_worker import inbox_workers
+from app.services.dispatcher import contact_dispatcher
+from app.services.dedup import seen_wamids
+from app.services.log_writer import webhook_log_writer
+from app.services.status_pipeline import status_coalescer
+from app.services.account_router import account_router
+from app.services.flow_config import flow_configs
+from app.services.whatsapp_service import graph_pool_stats
+from app.services.outbound_queue import outbound_queue
+from app.services.campaign_runner import campaign_runner
+from app.services.openai_service import ai_stats
+from app.services.webhook_handler import followup_stats
+from app.services.conversation_context import conversation_context
+from app.services.faq_index import faq_index
+from app.services.email_dispatcher import email_dispatcher
+from app.services.event_bus import event_bus
+from app.services.pg_notify import notify, pg_listener, ACCOUNT_ROUTING_CHANNEL
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -146,7 +165,10 @@ async def assign_whatsapp(
         business_account_id=business_account_id or None,
     )
     db.add(acc)
+    # Every process drops its cached route for this number once the commit lands
+    await notify(db, ACCOUNT_ROUTING_CHANNEL, phone_number_id)
     await db.commit()
+    account_router.invalidate(phone_number_id)
     return {"id": acc.id, "phone_number": acc.phone_number}
 
 
@@ -155,8 +177,93 @@ async def webhook_logs(
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(get_current_admin),
     limit: int = Query(100, ge=1, le=500),
+    phone_number_id: str | None = Query(None),
+    wamid: str | None = Query(None),
+    wa_from: str | None = Query(None),
+    event_status: str | None = Query(None),
+    since: datetime | None = Query(None),
+    before: datetime | None = Query(None, description="Keyset pagination: created_at of the last row seen"),
 ):
+    """Newest first. Time bounds prune partitions; the id/phone filters use indexed columns."""
+    q = select(WebhookLog)
+    if phone_number_id:
+        q = q.where(WebhookLog.phone_number_id == phone_number_id)
+    if wamid:
+        q = q.where(WebhookLog.wamid == wamid)
+    if wa_from:
+        q = q.where(WebhookLog.wa_from == wa_from)
+    if event_status:
+        q = q.where(WebhookLog.event_status == event_status)
+    if since:
+        q = q.where(WebhookLog.created_at >= since)
+    if before:
+        q = q.where(WebhookLog.created_at < before)
+    result = await db.execute(q.order_by(WebhookLog.created_at.desc()).limit(limit))
+    return [WebhookLogResponse.model_validate(l) for l in result.scalars().all()]
+
+
+@router.get("/webhook-inbox")
+async def webhook_inbox_stats(
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(get_current_admin),
+):
+    """Outstanding inbox rows per status, oldest pending delivery, and the latest dead letters."""
+    counts = await db.execute(select(WebhookInbox.status, func.count(WebhookInbox.id)).group_by(WebhookInbox.status))
+    oldest = await db.execute(
+        select(func.min(WebhookInbox.created_at)).where(WebhookInbox.status != InboxStatus.DEAD)
+    )
+    dead = await db.execute(
+        select(WebhookInbox.id, WebhookInbox.attempts, WebhookInbox.last_error, WebhookInbox.created_at)
+        .where(WebhookInbox.status == InboxStatus.DEAD)
+        .order_by(WebhookInbox.id.desc())
+        .limit(20)
+    )
+    return {
+        "counts": {r[0]: r[1] for r in counts.all()},
+        "oldest_pending_at": oldest.scalar(),
+        "dead": [
+            {"id": r[0], "attempts": r[1], "last_error": r[2], "created_at": r[3]}
+            for r in dead.all()
+        ],
+    }
+
+
+@router.post("/webhook-inbox/{row_id}/retry")
+async def retry_webhook_inbox(
+    row_id: int,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(get_current_admin),
+):
+    """Move a dead-lettered delivery back to pending with a fresh attempt budget."""
+    from fastapi import HTTPException
     result = await db.execute(
-        select(WebhookLog).order_by(WebhookLog.created_at.desc()).limit(limit)
+        update(WebhookInbox)
+        .where(WebhookInbox.id == row_id, WebhookInbox.status == InboxStatus.DEAD)
+        .values(status=InboxStatus.PENDING, attempts=0, next_attempt_at=datetime.utcnow(), last_error=None)
     )
-    return [WebhookLogResponse.model_validate(l) for l in result.scalars().all()]
+    if not result.rowcount:
+        raise HTTPException(404, "Dead-lettered inbox row not found")
+    await db.commit()
+    inbox_workers.wake()
+    return {"ok": True}
+
+
+@router.get("/metrics")
+async def runtime_metrics(admin: User = Depends(get_current_admin)):
+    """In-process runtime stats for this worker process (queues, pools, caches)."""
+    return {
+        "dispatcher": contact_dispatcher.stats(),
+        "wamid_dedup": seen_wamids.stats(),
+        "webhook_log_writer": webhook_log_writer.stats(),
+        "status_pipeline": status_coalescer.stats(),
+        "account_router": account_router.stats(),
+        "flow_configs": flow_configs.stats(),
+        "graph_http": graph_pool_stats(),
+        "outbound": outbound_queue.stats(),
+        "campaigns": campaign_runner.stats(),
+        "ai": dict(ai_stats(), followups=followup_stats(), context=conversation_context.stats()),
+        "faq": faq_index.stats(),
+        "email": email_dispatcher.stats(),
+        "events": event_bus.stats(),
+        "pg_listener": pg_listener.stats(),
+    }
@@ -0,0 +1,183 @@
+"""
+User: broadcast campaigns to conversations in a stage or leads with a status.
+Sending runs in the background (services/campaign_runner.py); progress is polled here.
+"""
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
+import uuid
+
+from app.database import get_db
+from app.core.deps import get_current_user
+from app.models.user import User
+from app.models.whatsapp import WhatsAppAccount
+from app.models.lead import LeadStatus
+from app.models.campaign import Campaign, CampaignRecipient, CampaignStatus, CampaignAudience
+from app.schemas.campaign import CampaignCreate, CampaignResponse, CampaignProgress, CampaignRecipientResponse
+from app.services.campaign_runner import campaign_runner, audience_query
+
+router = APIRouter(prefix="/campaigns", tags=["campaigns"])
+
+
+async def _get_campaign(db: AsyncSession, user: User, campaign_id: str) -> Campaign:
+    result = await db.execute(select(Campaign).where(Campaign.id == campaign_id, Campaign.user_id == user.id))
+    campaign = result.scalar_one_or_none()
+    if not campaign:
+        raise HTTPException(404, "Campaign not found")
+    return campaign
+
+
+def _progress(campaign: Campaign) -> CampaignProgress:
+    done = campaign.sent + campaign.failed
+    run = campaign_runner.progress(campaign.id)
+    return CampaignProgress(
+        **CampaignResponse.model_validate(campaign).model_dump(),
+        done=done,
+        percent=round(100 * done / campaign.total, 1) if campaign.total else 0.0,
+        messages_per_second=run.throughput() if run else None,
+        in_flight=run.in_flight if run else 0,
+    )
+
+
+@router.get("", response_model=list[CampaignResponse])
+async def list_campaigns(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+):
+    result = await db.execute(
+        select(Campaign)
+        .where(Campaign.user_id == current_user.id)
+        .order_by(Campaign.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return [CampaignResponse.model_validate(c) for c in result.scalars().all()]
+
+
+@router.post("", response_model=CampaignResponse)
+async def create_campaign(
+    data: CampaignCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if data.audience == CampaignAudience.LEAD_STATUS:
+        try:
+            LeadStatus(data.audience_value)
+        except ValueError:
+            raise HTTPException(422, f"Unknown lead status {data.audience_value!r}")
+    q = select(WhatsAppAccount).where(WhatsAppAccount.user_id == current_user.id, WhatsAppAccount.is_active == True)
+    if data.account_id:
+        q = q.where(WhatsAppAccount.id == data.account_id)
+    account = (await db.execute(q.order_by(WhatsAppAccount.created_at).limit(1))).scalar_one_or_none()
+    if not account:
+        raise HTTPException(400, "No active WhatsApp number to send from")
+    campaign = Campaign(
+        id=str(uuid.uuid4()),
+        user_id=current_user.id,
+        account_id=account.id,
+        name=data.name,
+        body=data.body,
+        audience=data.audience,
+        audience_value=data.audience_value,
+        status=CampaignStatus.DRAFT,
+        total=0,
+        sent=0,
+        failed=0,
+    )
+    db.add(campaign)
+    await db.flush()
+    return CampaignResponse.model_validate(campaign)
+
+
+@router.get("/{campaign_id}", response_model=CampaignProgress)
+async def get_campaign(
+    campaign_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return _progress(await _get_campaign(db, current_user, campaign_id))
+
+
+@router.post("/{campaign_id}/start", response_model=CampaignProgress)
+async def start_campaign(
+    campaign_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Start a draft campaign, or resume a paused one (recipients already sent to are skipped)."""
+    campaign = await _get_campaign(db, current_user, campaign_id)
+    # Count of remaining recipients, computed in the database
+    remaining = (await db.execute(select(func.count()).select_from(audience_query(campaign).subquery()))).scalar()
+    result = await db.execute(
+        update(Campaign)
+        .where(
+            Campaign.id == campaign.id,
+            Campaign.status.in_([CampaignStatus.DRAFT, CampaignStatus.PAUSED]),
+        )
+        .values(
+            status=CampaignStatus.RUNNING,
+            total=Campaign.sent + Campaign.failed + remaining,
+            started_at=func.coalesce(Campaign.started_at, datetime.utcnow()),
+        )
+        .returning(Campaign.id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(409, f"Campaign is {campaign.status}")
+    await db.commit()
+    await db.refresh(campaign)
+    campaign_runner.start(campaign.id)
+    return _progress(campaign)
+
+
+@router.post("/{campaign_id}/pause", response_model=CampaignProgress)
+async def pause_campaign(
+    campaign_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return await _stop_campaign(db, current_user, campaign_id, CampaignStatus.PAUSED)
+
+
+@router.post("/{campaign_id}/cancel", response_model=CampaignProgress)
+async def cancel_campaign(
+    campaign_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return await _stop_campaign(db, current_user, campaign_id, CampaignStatus.CANCELLED)
+
+
+async def _stop_campaign(db: AsyncSession, user: User, campaign_id: str, status: str) -> CampaignProgress:
+    campaign = await _get_campaign(db, user, campaign_id)
+    if campaign.status in (CampaignStatus.COMPLETED, CampaignStatus.CANCELLED):
+        raise HTTPException(409, f"Campaign is {campaign.status}")
+    campaign.status = status
+    if status == CampaignStatus.CANCELLED:
+        campaign.finished_at = datetime.utcnow()
+    await db.commit()
+    # Stops at once here; a run in another process stops at its next recipient batch
+    await campaign_runner.cancel(campaign.id)
+    await db.refresh(campaign)
+    return _progress(campaign)
+
+
+@router.get("/{campaign_id}/recipients", response_model=list[CampaignRecipientResponse])
+async def list_campaign_recipients(
+    campaign_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    status: str | None = Query(None),
+    before_id: int | None = Query(None, description="Keyset pagination: id of the last row from the previous page"),
+    limit: int = Query(100, ge=1, le=500),
+):
+    campaign = await _get_campaign(db, current_user, campaign_id)
+    q = select(CampaignRecipient).where(CampaignRecipient.campaign_id == campaign.id)
+    if status:
+        q = q.where(CampaignRecipient.status == status)
+    if before_id is not None:
+        q = q.where(CampaignRecipient.id < before_id)
+    result = await db.execute(q.order_by(CampaignRecipient.id.desc()).limit(limit))
+    return [CampaignRecipientResponse.model_validate(r) for r in result.scalars().all()]
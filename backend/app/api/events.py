@@ -0,0 +1,59 @@
+"""
+User: live dashboard events over Server-Sent Events.
+EventSource cannot send an Authorization header, so the JWT comes as ?token=. The user is looked
+up once per connection; after that the stream costs no queries, only the in-process event bus.
+"""
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.config import settings
+from app.core.security import decode_access_token
+from app.database import AsyncSessionLocal
+from app.models.user import User
+from app.services.event_bus import event_bus
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+async def _user_id_from_token(token: str) -> str:
+    payload = decode_access_token(token)
+    if not payload or "sub" not in payload:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    # Short-lived session: the stream must not hold a pooled connection while it is open
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(User.id).where(User.id == payload["sub"]).where(User.is_active == True)
+        )
+        user_id = result.scalar_one_or_none()
+    if not user_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return user_id
+
+
+@router.get("/stream")
+async def event_stream(request: Request, token: str = Query(...)):
+    """text/event-stream of notification, message and stage events for the current user."""
+    user_id = await _user_id_from_token(token)
+
+    async def stream():
+        with event_bus.subscribe(user_id) as queue:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), timeout=settings.event_stream_heartbeat)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": ping\n\n"  # Keeps proxies from closing an idle stream
+                    continue
+                yield f"event: {data['type']}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
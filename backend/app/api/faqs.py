@@ -0,0 +1,108 @@
+"""
+User: FAQ entries answered locally before the AI fallback.
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+import uuid
+
+from app.database import get_db
+from app.core.deps import get_current_user
+from app.models.user import User
+from app.models.faq import FaqEntry
+from app.schemas.faq import FaqCreate, FaqUpdate, FaqResponse, FaqMatchRequest, FaqMatchResponse
+from app.services.faq_index import faq_index
+from app.services.pg_notify import notify, FAQ_CHANNEL
+
+router = APIRouter(prefix="/faqs", tags=["faqs"])
+
+MAX_ENTRIES = 500
+
+
+async def _get_entry(db: AsyncSession, user: User, faq_id: str) -> FaqEntry:
+    result = await db.execute(select(FaqEntry).where(FaqEntry.id == faq_id, FaqEntry.user_id == user.id))
+    entry = result.scalar_one_or_none()
+    if not entry:
+        raise HTTPException(404, "FAQ entry not found")
+    return entry
+
+
+async def _changed(db: AsyncSession, user: User, faq_id: str) -> None:
+    """Commit, then have every process (this one included) re-index just this entry."""
+    payload = f"{user.id}:{faq_id}"
+    await notify(db, FAQ_CHANNEL, payload)
+    await db.commit()
+    faq_index.invalidate(payload)
+
+
+@router.get("", response_model=list[FaqResponse])
+async def list_faqs(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    result = await db.execute(
+        select(FaqEntry).where(FaqEntry.user_id == current_user.id).order_by(FaqEntry.created_at)
+    )
+    return [FaqResponse.model_validate(e) for e in result.scalars().all()]
+
+
+@router.post("", response_model=FaqResponse)
+async def create_faq(
+    data: FaqCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    count = (await db.execute(select(func.count(FaqEntry.id)).where(FaqEntry.user_id == current_user.id))).scalar()
+    if count >= MAX_ENTRIES:
+        raise HTTPException(400, f"At most {MAX_ENTRIES} FAQ entries")
+    entry = FaqEntry(id=str(uuid.uuid4()), user_id=current_user.id, **data.model_dump())
+    db.add(entry)
+    await db.flush()
+    await _changed(db, current_user, entry.id)
+    await db.refresh(entry)
+    return FaqResponse.model_validate(entry)
+
+
+@router.patch("/{faq_id}", response_model=FaqResponse)
+async def update_faq(
+    faq_id: str,
+    data: FaqUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    entry = await _get_entry(db, current_user, faq_id)
+    for k, v in data.model_dump(exclude_unset=True).items():
+        setattr(entry, k, v)
+    await _changed(db, current_user, entry.id)
+    await db.refresh(entry)
+    return FaqResponse.model_validate(entry)
+
+
+@router.delete("/{faq_id}")
+async def delete_faq(
+    faq_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    entry = await _get_entry(db, current_user, faq_id)
+    await db.delete(entry)
+    await _changed(db, current_user, faq_id)
+    return {"ok": True}
+
+
+@router.post("/match", response_model=FaqMatchResponse)
+async def match_faq(
+    data: FaqMatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Which entry a message would hit, and how close it is to the threshold."""
+    best = await faq_index.best(db, current_user.id, data.text)
+    score = best.score if best else 0.0
+    return FaqMatchResponse(
+        faq_id=best.faq_id if best else None,
+        answer=best.answer if best else None,
+        score=round(score, 4),
+        threshold=faq_index.threshold,
+        matched=score >= faq_index.threshold,
+    )
@@ -1,15 +1,16 @@
 """
-User: list notifications, mark as read.
+User: list notifications, unread count, mark as read (one or in bulk).
 """
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, update
+from datetime import timezone
 
 from app.database import get_db
 from app.core.deps import get_current_user
 from app.models.user import User
 from app.models.notification import Notification
-from app.schemas.notification import NotificationResponse
+from app.schemas.notification import NotificationResponse, NotificationUnreadCount, NotificationMarkRead
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
@@ -29,6 +30,48 @@ async def list_notifications(
     return [NotificationResponse.model_validate(n) for n in result.scalars().all()]
 
 
+@router.get("/unread-count", response_model=NotificationUnreadCount)
+async def unread_count(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # Counted from the partial index on unread rows; read history is never scanned
+    result = await db.execute(
+        select(func.count()).select_from(Notification).where(
+            Notification.user_id == current_user.id,
+            Notification.is_read == False,
+        )
+    )
+    return NotificationUnreadCount(count=result.scalar_one())
+
+
+@router.post("/read")
+async def mark_many_read(
+    data: NotificationMarkRead,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Bulk mark-read as a single UPDATE, by ids or by "everything up to `before`"."""
+    from fastapi import HTTPException
+    if (data.ids is None) == (data.before is None):
+        raise HTTPException(400, "Give either ids or before")
+    q = update(Notification).where(
+        Notification.user_id == current_user.id,
+        Notification.is_read == False,
+    )
+    if data.ids is not None:
+        if not data.ids:
+            return {"ok": True, "updated": 0}
+        q = q.where(Notification.id.in_(data.ids))
+    else:
+        before = data.before
+        if before.tzinfo is not None:
+            before = before.astimezone(timezone.utc).replace(tzinfo=None)  # created_at is naive UTC
+        q = q.where(Notification.created_at <= before)
+    result = await db.execute(q.values(is_read=True).execution_options(synchronize_session=False))
+    return {"ok": True, "updated": result.rowcount}
+
+
 @router.post("/{notification_id}/read")
 async def mark_read(
     notification_id: str,
@@ -1,7 +1,7 @@
 """
-User: get/update conversation flow messages and AI fallback per stage.
+User: get/update conversation flow messages and AI fallback per stage, or a custom flow graph.
 """
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import uuid
@@ -11,6 +11,10 @@ from app.core.deps import get_current_user
 from app.models.user import User
 from app.models.conversation import ConversationConfig
 from app.schemas.conversation import ConversationConfigResponse, ConversationConfigUpdate
+from app.services.flow_config import flow_configs
+from app.services.reply_cache import reply_cache
+from app.services.flow_engine import compile_flow, FlowError
+from app.services.pg_notify import notify, FLOW_CONFIG_CHANNEL
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
@@ -38,15 +42,29 @@ async def update_conversation_flow(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    result = await db.execute(select(ConversationConfig).where(ConversationConfig.user_id == current_user.id))
+    # Row lock: concurrent saves bump the version one after the other, so each NOTIFY carries a new version
+    result = await db.execute(
+        select(ConversationConfig).where(ConversationConfig.user_id == current_user.id).with_for_update()
+    )
     config = result.scalar_one_or_none()
     if not config:
         config = ConversationConfig(id=str(uuid.uuid4()), user_id=current_user.id)
         db.add(config)
         await db.flush()
     update = data.model_dump(exclude_unset=True)
+    if update.get("flow"):
+        # Reject definitions that would not compile (dangling next/start, duplicate names, ...)
+        try:
+            compile_flow(update["flow"])
+        except FlowError as e:
+            raise HTTPException(422, str(e))
     for k, v in update.items():
         setattr(config, k, v)
-    await db.flush()
+    config.version = (config.version or 0) + 1
+    # Every worker process drops its compiled copy once this commits
+    await notify(db, FLOW_CONFIG_CHANNEL, f"{current_user.id}:{config.version}")
+    await db.commit()
+    flow_configs.invalidate(f"{current_user.id}:{config.version}")
+    reply_cache.invalidate(f"{current_user.id}:{config.version}")  # Cached AI answers used the old flow
     await db.refresh(config)
     return ConversationConfigResponse.model_validate(config)
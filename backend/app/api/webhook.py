@@ -3,13 +3,12 @@ WhatsApp Cloud API webhook: GET for verification, POST for incoming messages.
 """
 from fastapi import APIRouter, Request, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-import json
-import uuid
 
 from app.database import get_db
 from app.config import settings
-from app.models.whatsapp import WebhookLog
-from app.services.webhook_handler import process_incoming_message
+from app.models.inbox import WebhookInbox
+from app.services.inbox_worker import inbox_workers
+from app.services.log_writer import webhook_log_writer
 
 router = APIRouter(prefix="/webhook", tags=["webhook"])
 
@@ -29,30 +28,18 @@ async def verify_webhook(
 
 @router.post("")
 async def handle_webhook(request: Request, db: AsyncSession = Depends(get_db)):
-    """Receive incoming messages and status updates from WhatsApp."""
-    try:
-        body = await request.body()
-        payload = json.loads(body) if body else {}
-    except Exception:
-        payload = {}
-    # Log raw payload for debugging
-    log = WebhookLog(
-        payload=json.dumps(payload)[:10000],
-        direction="inbound",
-        phone_number_id=None,
-        status="received",
-    )
-    db.add(log)
-    await db.flush()
-    # Ignore if not a message (e.g. status updates)
-    if "entry" not in payload:
+    """
+    Receive incoming messages and status updates from WhatsApp.
+    Only persists the delivery to the inbox and acks; inbox workers run the conversation flow
+    and apply status callbacks, so nothing Meta got a 200 for is held only in memory.
+    """
+    body = await request.body()
+    # Cheap pre-filter; inbox workers do the real parse and drop anything without entries
+    queued = b'"entry"' in body
+    # Log raw payload for debugging (buffered, written in batches off the request path)
+    webhook_log_writer.submit(body, status="queued" if queued else "received")
+    if queued:
+        db.add(WebhookInbox(payload=body.decode("utf-8", errors="replace")))
         await db.commit()
-        return {"status": "ok"}
-    try:
-        await process_incoming_message(db, payload)
-        log.status = "processed"
-    except Exception as e:
-        log.status = "error"
-        log.error_message = str(e)[:2000]
-    await db.commit()
+        inbox_workers.wake()
     return {"status": "ok"}
@@ -21,6 +21,9 @@ class Settings(BaseSettings):
     # Database (Railway: add reference to PostgreSQL → DATABASE_URL or DATABASE_PRIVATE_URL)
     database_url: str = "postgresql+asyncpg://localhost/whatsapp_saas"
     sync_database_url: str | None = None  # Optional; if unset, derived from database_url
+    # Pool must cover request handlers + inbox workers + dispatcher concurrency
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
 
     @field_validator("database_url", mode="before")
     @classmethod
@@ -44,9 +47,103 @@ class Settings(BaseSettings):
 
     # WhatsApp Cloud API
     whatsapp_verify_token: str = "my-verify-token"
+    # Point at scripts/mock_upstreams.py (e.g. http://localhost:9000/graph/v18.0) for local load tests
+    graph_base_url: str = "https://graph.facebook.com/v18.0"
+
+    # Shared Graph API client (one pool per process)
+    graph_http2: bool = True
+    graph_max_connections: int = 100
+    graph_max_keepalive_connections: int = 20
+    graph_keepalive_expiry: float = 60.0
+    graph_connect_timeout: float = 5.0
+    graph_read_timeout: float = 30.0
+    graph_write_timeout: float = 10.0
+    graph_pool_timeout: float = 5.0  # Waiting for a free connection
+
+    # Webhook inbox: POST /webhook only persists the payload; workers claim and process rows.
+    # Set INBOX_WORKERS=0 on nodes that should only accept webhooks.
+    inbox_workers: int = 4
+    inbox_batch_size: int = 10          # Rows claimed per round trip
+    inbox_poll_interval: float = 1.0    # Seconds; idle workers re-check (other nodes may have inserted)
+    inbox_lease_seconds: int = 300      # Claimed rows are reclaimed if a worker dies mid-processing
+    inbox_max_attempts: int = 5         # Then the row is dead-lettered
+    inbox_retry_base_seconds: float = 5.0  # Exponential backoff: base * 2^(attempt-1)
+
+    # Contact dispatcher: messages of one (user_id, wa_phone) run in order on one lane,
+    # different contacts run in parallel (each job holds its own DB session).
+    dispatcher_lanes: int = 16
+    dispatcher_max_concurrency: int = 8
+    dispatcher_lane_queue_size: int = 100
+
+    # Cross-process cache invalidation via Postgres LISTEN/NOTIFY (one extra connection per process)
+    pg_listen_enabled: bool = True
+    # phone_number_id -> account routing table; full reload backstop and cache of unknown numbers
+    account_cache_ttl: float = 300.0
+    account_negative_ttl: float = 60.0
+    # Compiled flow configs are dropped on NOTIFY; the TTL only bounds staleness if one is missed
+    flow_config_ttl: float = 600.0
+
+    # Replayed deliveries: recently processed wamids kept in memory per process
+    dedup_cache_size: int = 100_000
+
+    # webhook_logs are written in the background: flush every N rows or T ms
+    webhook_log_batch_size: int = 200
+    webhook_log_flush_ms: int = 500
+    webhook_log_buffer: int = 10_000        # Max pending rows per process
+    webhook_log_overflow: str = "drop_oldest"  # or "drop_newest" when the buffer is full
+    # webhook_logs is partitioned by day; partitions older than the retention window are dropped
+    webhook_log_retention_days: int = 14
+    webhook_log_compression_level: int = 6  # zlib 1 (fast) .. 9 (small)
+    webhook_log_partitions_ahead: int = 3
+    webhook_log_maintenance_interval: float = 3600.0  # Seconds; 0 disables maintenance in this process
+
+    # Status callbacks (sent/delivered/read/failed) are coalesced per wamid and applied in batches
+    status_batch_size: int = 500
+    status_flush_ms: int = 1000
+    status_max_pending: int = 100_000
+    status_max_retries: int = 3  # Flushes to wait for an outbound row that is not committed yet
+
+    # Outbound sends: token bucket per phone_number_id, retries for 429/5xx/network errors
+    outbound_rate_per_second: float = 20.0
+    outbound_burst: int = 40
+    outbound_max_concurrency: int = 32
+    outbound_max_attempts: int = 5
+    outbound_retry_base_seconds: float = 1.0
+    outbound_retry_max_seconds: float = 60.0
+    # Startup sweep: outbound rows still "queued" after this long belong to a dead process (0 disables)
+    outbound_recover_after: float = 300.0
+    outbound_recover_max_age: float = 24 * 3600.0  # Older ones are failed rather than sent late
+
+    # Campaigns: recipients are streamed from the database and sent by a fixed worker pool
+    campaign_concurrency: int = 8  # Concurrent sends per running campaign (the per-number bucket still applies)
+    campaign_fetch_size: int = 500  # Rows per server-side cursor fetch
+    campaign_batch_size: int = 200  # Recipient outcomes per insert
 
     # OpenAI
     openai_api_key: str = ""
+    openai_base_url: str = "https://api.openai.com/v1"  # Or the stand-in: http://localhost:9000/openai/v1
+    openai_max_connections: int = 20
+    openai_timeout: float = 15.0  # Hard cap per request (a late answer can still be sent as a follow-up)
+    # Concurrent OpenAI requests across all tenants (halved on 429, grows back on success)
+    ai_max_concurrency: int = 16
+    ai_max_queued_per_tenant: int = 50  # Beyond this a tenant's AI requests fall back to the static reply
+    ai_throttle_pause: float = 2.0  # Seconds to pause dispatch on a 429 without Retry-After
+    ai_reply_budget_ms: int = 3000  # Default wait before the static stage reply goes out; per tenant in settings
+    # AI reply cache: per tenant + stage context + normalized message text
+    ai_cache_size: int = 10_000  # 0 disables
+    ai_cache_ttl: float = 6 * 3600.0
+    ai_cache_max_text: int = 200  # Longer messages are not cached
+    # FAQ entries are answered locally when the cosine similarity reaches this (0..1)
+    faq_match_threshold: float = 0.6
+    # Recent conversation turns sent with AI prompts
+    ai_context_turns: int = 8
+    ai_context_max_tokens: int = 600  # Oldest turns are dropped beyond this (estimated) budget
+    ai_context_max_chars: int = 500  # Per stored turn
+    ai_context_cache_size: int = 20_000  # Conversations kept in memory per process
+
+    # Dashboard event stream (GET /api/events/stream)
+    event_stream_queue_size: int = 100  # Pending events per open stream; a slower client is told to resync
+    event_stream_heartbeat: float = 15.0  # Seconds between keep-alive comments
 
     # App
     app_url: str = "http://localhost:8000"
@@ -57,6 +154,10 @@ class Settings(BaseSettings):
     smtp_user: str = ""
     smtp_password: str = ""
     smtp_from: str = "noreply@example.com"
+    smtp_timeout: float = 30.0
+    smtp_idle_close: float = 300.0  # Close the shared SMTP connection after this long without mail
+    email_digest_seconds: float = 10.0  # Leads for one user within this window go out as one digest
+    email_queue_max: int = 10000
 
     # CORS
     cors_origins: str = "http://localhost:3000"
@@ -10,6 +10,8 @@ from app.config import settings
 engine = create_async_engine(
     settings.database_url,
     echo=False,  # Set True for SQL logging during development
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
 )
 
 AsyncSessionLocal = async_sessionmaker(
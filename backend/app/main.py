@@ -7,8 +7,19 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.api import auth, webhook, conversations, leads, settings as settings_api, notifications, admin, accounts
+from app.api import auth, webhook, conversations, leads, settings as settings_api, notifications, admin, accounts, campaigns, faqs, events
 from app.core.ensure_admin import ensure_admin_from_env
+from app.services.inbox_worker import inbox_workers
+from app.services.dispatcher import contact_dispatcher
+from app.services.log_writer import webhook_log_writer
+from app.services.log_retention import log_retention
+from app.services.status_pipeline import status_coalescer
+from app.services.pg_notify import pg_listener
+from app.services.outbound_queue import outbound_queue
+from app.services.campaign_runner import campaign_runner
+from app.services.email_dispatcher import email_dispatcher
+from app.services.whatsapp_service import close_graph_client
+from app.services.openai_service import close_openai_client
 
 
 @asynccontextmanager
@@ -24,8 +35,27 @@ async def lifespan(app: FastAPI):
             )
     # Create admin from ADMIN_EMAIL / ADMIN_PASSWORD if set
     await ensure_admin_from_env()
+    await pg_listener.start()  # Cross-process cache invalidation; loads the account routing table
+    await webhook_log_writer.start()
+    await log_retention.start()  # Daily webhook_logs partitions + retention
+    await status_coalescer.start()
+    await email_dispatcher.start()
+    await outbound_queue.start()  # Re-sends replies a previous process left queued
+    # Drain the webhook inbox in the background (no-op when INBOX_WORKERS=0)
+    await inbox_workers.start()
     yield
-    # Shutdown (if needed later)
+    # Shutdown
+    await inbox_workers.stop()
+    await contact_dispatcher.stop()
+    await campaign_runner.stop()  # Running campaigns are paused; start them again to resume
+    await outbound_queue.stop()  # Unsent replies stay "queued" until the next startup sweep
+    await status_coalescer.stop()  # Applies pending status updates
+    await email_dispatcher.stop()  # Sends whatever is still queued
+    await webhook_log_writer.stop()  # Writes whatever is still buffered
+    await log_retention.stop()
+    await pg_listener.stop()
+    await close_graph_client()
+    await close_openai_client()
 
 
 app = FastAPI(
@@ -53,6 +83,9 @@ app.include_router(leads.router, prefix="/api")
 app.include_router(settings_api.router, prefix="/api")
 app.include_router(notifications.router, prefix="/api")
 app.include_router(accounts.router, prefix="/api")
+app.include_router(campaigns.router, prefix="/api")
+app.include_router(faqs.router, prefix="/api")
+app.include_router(events.router, prefix="/api")
 
 # Admin
 app.include_router(admin.router, prefix="/api")
@@ -4,6 +4,9 @@ from app.models.conversation import ConversationConfig, ConversationStage
 from app.models.lead import Lead, LeadStatus
 from app.models.message import Conversation, Message
 from app.models.notification import Notification
+from app.models.inbox import WebhookInbox, InboxStatus
+from app.models.faq import FaqEntry
+from app.models.campaign import Campaign, CampaignRecipient, CampaignStatus, CampaignAudience
 
 __all__ = [
     "User",
@@ -17,4 +20,11 @@ __all__ = [
     "Conversation",
     "Message",
     "Notification",
+    "WebhookInbox",
+    "InboxStatus",
+    "Campaign",
+    "CampaignRecipient",
+    "CampaignStatus",
+    "CampaignAudience",
+    "FaqEntry",
 ]
@@ -0,0 +1,60 @@
+"""
+Broadcast campaigns: one message body sent to every contact matching an audience
+(conversations in a stage, or leads with a status). Isolated per user (user_id).
+"""
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, ForeignKey, Index
+from datetime import datetime
+
+from app.database import Base
+
+
+class CampaignStatus:
+    DRAFT = "draft"
+    RUNNING = "running"
+    PAUSED = "paused"          # Stopped by a shutdown or by the user; start again to resume
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+
+class CampaignAudience:
+    CONVERSATION_STAGE = "conversation_stage"  # audience_value = stage name
+    LEAD_STATUS = "lead_status"                # audience_value = LeadStatus value
+
+
+class Campaign(Base):
+    __tablename__ = "campaigns"
+
+    id = Column(String(36), primary_key=True, index=True)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    account_id = Column(String(36), ForeignKey("whatsapp_accounts.id"), nullable=False)
+    name = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    audience = Column(String(32), nullable=False)
+    audience_value = Column(String(64), nullable=False)
+    status = Column(String(16), default=CampaignStatus.DRAFT, nullable=False)
+    # Counters are updated with every recipient batch, so they double as progress
+    total = Column(Integer, default=0, nullable=False)
+    sent = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CampaignRecipient(Base):
+    """Outcome per recipient. Written in batches; resuming a campaign skips phones already recorded here."""
+    __tablename__ = "campaign_recipients"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    campaign_id = Column(String(36), ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=False)
+    wa_phone = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False)  # sent | failed
+    wa_message_id = Column(String(128), nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=1, nullable=False)
+    sent_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ux_campaign_recipients_campaign_id_wa_phone", "campaign_id", "wa_phone", unique=True),
+    )
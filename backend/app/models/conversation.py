@@ -1,7 +1,8 @@
 """
 Conversation flow: stages and default/custom messages per user.
 """
-from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, Integer, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -20,7 +21,8 @@ class ConversationStage(str, enum.Enum):
 class ConversationConfig(Base):
     """
     Per-user customization of messages per stage.
-    One row per user; each stage has a message and optional AI fallback flag.
+    One row per user; each stage has a message and optional AI fallback flag,
+    unless the user defined a custom flow graph in `flow`.
     """
     __tablename__ = "conversation_configs"
 
@@ -40,6 +42,15 @@ class ConversationConfig(Base):
     ai_fallback_ask_requirement = Column(Boolean, default=False, nullable=False)
     ai_fallback_ask_contact = Column(Boolean, default=False, nullable=False)
     ai_fallback_done = Column(Boolean, default=False, nullable=False)
+    # Max wait for an AI reply before the static stage message goes out (NULL = AI_REPLY_BUDGET_MS)
+    ai_reply_budget_ms = Column(Integer, nullable=True)
+    ai_followup = Column(Boolean, default=False, nullable=False)  # Send the late AI answer as a second message
+
+    # Custom flow definition (see services/flow_engine); NULL = classic flow from the columns above
+    flow = Column(JSONB, nullable=True)
+
+    # Bumped on every update; workers compare it to their cached compiled copy
+    version = Column(Integer, default=1, nullable=False)
 
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,19 @@
+"""
+Per-user FAQ entries, answered locally (services/faq_index.py) before falling back to the AI.
+"""
+from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey
+from datetime import datetime
+
+from app.database import Base
+
+
+class FaqEntry(Base):
+    __tablename__ = "faq_entries"
+
+    id = Column(String(36), primary_key=True, index=True)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    question = Column(Text, nullable=False)  # One or more phrasings, one per line
+    answer = Column(Text, nullable=False)
+    is_active = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,40 @@
+"""
+Durable inbox for raw webhook deliveries.
+The webhook endpoint only inserts here; background workers claim rows and run the conversation flow.
+"""
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, Index
+from datetime import datetime
+
+from app.database import Base
+
+
+class InboxStatus:
+    PENDING = "pending"        # Waiting for a worker (new or scheduled for retry)
+    PROCESSING = "processing"  # Claimed by a worker until locked_until
+    DEAD = "dead"              # Gave up after max attempts or unparseable payload
+
+
+class WebhookInbox(Base):
+    """
+    One row per POST /webhook delivery. Rows are deleted once processed successfully,
+    so the table only holds outstanding and dead-lettered work.
+    """
+    __tablename__ = "webhook_inbox"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    payload = Column(Text, nullable=False)  # Raw request body as received
+    status = Column(String(16), default=InboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_until = Column(DateTime, nullable=True)  # Lease; expired leases are reclaimed
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_webhook_inbox_claim",
+            "status",
+            "next_attempt_at",
+            postgresql_where=(status != InboxStatus.DEAD),
+        ),
+    )
@@ -1,7 +1,8 @@
 """
 Conversations (one per WhatsApp contact) and messages for history.
 """
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Boolean, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -16,15 +17,19 @@ class Conversation(Base):
     __tablename__ = "conversations"
 
     id = Column(String(36), primary_key=True, index=True)
-    user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)  # Leading column of the unique index
     wa_phone = Column(String(32), nullable=False, index=True)
     current_stage = Column(String(32), default="NEW", nullable=False)
     is_complete = Column(Boolean, default=False, nullable=False)
+    # Values captured as stages complete, e.g. {"name": ..., "requirement": ..., "contact": ...}
+    slots = Column(JSONB, nullable=True)
+    # Last few turns for AI prompts, {"seq": n, "turns": [[role, text], ...]} (see services/conversation_context)
+    recent_context = Column(JSONB, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # Unique per user + wa_phone
-    __table_args__ = ({"schema": None})  # Use unique constraint per (user_id, wa_phone) in app logic
+    # Unique per user + wa_phone; the webhook handler upserts on this key
+    __table_args__ = (Index("ux_conversations_user_id_wa_phone", "user_id", "wa_phone", unique=True),)
 
     user = relationship("User", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", order_by="Message.created_at")
@@ -37,6 +42,11 @@ class Message(Base):
     conversation_id = Column(String(36), ForeignKey("conversations.id"), nullable=False, index=True)
     direction = Column(String(16), nullable=False)  # inbound | outbound
     body = Column(Text, nullable=False)
+    wa_message_id = Column(String(128), nullable=True, unique=True, index=True)  # wamid; dedups Meta redeliveries
+    # Outbound only: latest status callback (sent | delivered | read | failed)
+    delivery_status = Column(String(16), nullable=True)
+    status_updated_at = Column(DateTime, nullable=True)
+    delivery_error = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     conversation = relationship("Conversation", back_populates="messages")
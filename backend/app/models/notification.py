@@ -1,7 +1,7 @@
 """
 In-app notifications for new leads (and future: email/WhatsApp sent log).
 """
-from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -20,3 +20,8 @@ class Notification(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="notifications")
+
+    __table_args__ = (
+        # Unread counts, unread listing and bulk mark-read only touch unread rows
+        Index("ix_notifications_unread", "user_id", "created_at", postgresql_where=(is_read == False)),
+    )
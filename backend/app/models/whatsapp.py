@@ -2,7 +2,8 @@
 WhatsApp Cloud API: accounts (phone numbers + tokens) and webhook logs.
 Supports multiple numbers per user for future upgrade.
 """
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, Integer
+import zlib
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, BigInteger, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -14,7 +15,7 @@ class WhatsAppAccount(Base):
 
     id = Column(String(36), primary_key=True, index=True)
     user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
-    phone_number_id = Column(String(64), nullable=False)  # WhatsApp Cloud API phone number ID
+    phone_number_id = Column(String(64), nullable=False, index=True)  # WhatsApp Cloud API phone number ID
     phone_number = Column(String(32), nullable=False)    # Display number e.g. +1234567890
     access_token = Column(Text, nullable=False)          # Encrypted in production recommended
     business_account_id = Column(String(64), nullable=True)
@@ -26,12 +27,29 @@ class WhatsAppAccount(Base):
 
 
 class WebhookLog(Base):
+    """
+    Raw webhook deliveries for debugging. Range-partitioned by day on created_at
+    (old partitions are dropped by services/log_retention.py), so created_at is part of the key.
+    The payload is stored zlib-compressed; lookup fields are extracted into indexed columns.
+    """
     __tablename__ = "webhook_logs"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    payload = Column(Text, nullable=True)       # Raw JSON payload
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow, index=True)
+    payload_gz = Column(LargeBinary, nullable=True)  # zlib-compressed raw JSON payload
     direction = Column(String(16), nullable=True)  # inbound / outbound
     phone_number_id = Column(String(64), nullable=True, index=True)
+    wamid = Column(String(128), nullable=True, index=True)  # First message / status id
+    wa_from = Column(String(32), nullable=True, index=True)  # Sender (messages) or recipient (statuses)
+    event_status = Column(String(16), nullable=True)  # "message" or sent / delivered / read / failed
     status = Column(String(32), nullable=True)  # processed, error, etc.
     error_message = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    @property
+    def payload(self) -> str | None:
+        """Decompressed raw JSON payload."""
+        if self.payload_gz is None:
+            return None
+        return zlib.decompress(self.payload_gz).decode("utf-8", errors="replace")
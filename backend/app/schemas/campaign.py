@@ -0,0 +1,50 @@
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+from datetime import datetime
+
+
+class CampaignCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=255)
+    body: str = Field(min_length=1, max_length=4096)  # WhatsApp text message limit
+    audience: Literal["conversation_stage", "lead_status"]
+    audience_value: str = Field(min_length=1, max_length=64)
+    account_id: Optional[str] = None  # Defaults to the user's first active number
+
+
+class CampaignResponse(BaseModel):
+    id: str
+    account_id: str
+    name: str
+    body: str
+    audience: str
+    audience_value: str
+    status: str
+    total: int
+    sent: int
+    failed: int
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CampaignProgress(CampaignResponse):
+    done: int
+    percent: float
+    messages_per_second: Optional[float] = None  # Since start (or resume) in this process
+    in_flight: int = 0
+
+
+class CampaignRecipientResponse(BaseModel):
+    id: int
+    wa_phone: str
+    status: str
+    wa_message_id: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int
+    sent_at: datetime
+
+    class Config:
+        from_attributes = True
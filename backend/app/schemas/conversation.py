@@ -1,5 +1,23 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+
+class FlowStage(BaseModel):
+    """What happens when a message arrives while the conversation is in this stage."""
+    name: str = Field(min_length=1, max_length=32)
+    next: Optional[str] = None          # Default: stay in this stage
+    reply: Optional[str] = None
+    ai: Literal["off", "fallback", "first"] = "off"
+    ai_context: Optional[str] = None
+    capture: Optional[str] = Field(None, max_length=64)  # Slot name for the message text
+    reset_slots: bool = False
+    create_lead: bool = False
+
+
+class FlowDefinition(BaseModel):
+    start: Optional[str] = None         # Default: first stage
+    fallback_stage: Optional[str] = None  # For conversations in a stage the flow no longer has; default: last
+    stages: list[FlowStage] = Field(min_length=1, max_length=50)
 
 
 class ConversationConfigUpdate(BaseModel):
@@ -13,6 +31,9 @@ class ConversationConfigUpdate(BaseModel):
     ai_fallback_ask_requirement: Optional[bool] = None
     ai_fallback_ask_contact: Optional[bool] = None
     ai_fallback_done: Optional[bool] = None
+    ai_reply_budget_ms: Optional[int] = Field(None, ge=0, le=30_000)
+    ai_followup: Optional[bool] = None
+    flow: Optional[FlowDefinition] = None  # null reverts to the classic flow
 
 
 class ConversationConfigResponse(BaseModel):
@@ -28,6 +49,10 @@ class ConversationConfigResponse(BaseModel):
     ai_fallback_ask_requirement: bool
     ai_fallback_ask_contact: bool
     ai_fallback_done: bool
+    ai_reply_budget_ms: Optional[int] = None
+    ai_followup: bool = False
+    flow: Optional[dict] = None
+    version: int
 
     class Config:
         from_attributes = True
@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class FaqCreate(BaseModel):
+    question: str = Field(min_length=1, max_length=2000)  # One or more phrasings, one per line
+    answer: str = Field(min_length=1, max_length=4096)
+    is_active: bool = True
+
+
+class FaqUpdate(BaseModel):
+    question: Optional[str] = Field(None, min_length=1, max_length=2000)
+    answer: Optional[str] = Field(None, min_length=1, max_length=4096)
+    is_active: Optional[bool] = None
+
+
+class FaqResponse(BaseModel):
+    id: str
+    question: str
+    answer: str
+    is_active: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class FaqMatchRequest(BaseModel):
+    text: str = Field(min_length=1, max_length=2000)
+
+
+class FaqMatchResponse(BaseModel):
+    faq_id: Optional[str] = None
+    answer: Optional[str] = None
+    score: float
+    threshold: float
+    matched: bool
@@ -7,6 +7,7 @@ class MessageResponse(BaseModel):
     id: str
     direction: str
     body: str
+    delivery_status: Optional[str] = None
     created_at: datetime
 
     class Config:
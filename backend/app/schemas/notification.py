@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
@@ -13,3 +13,13 @@ class NotificationResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class NotificationUnreadCount(BaseModel):
+    count: int
+
+
+class NotificationMarkRead(BaseModel):
+    """Exactly one of: the ids to mark read, or mark everything created up to `before` read."""
+    ids: Optional[list[str]] = Field(None, max_length=500)
+    before: Optional[datetime] = None
@@ -19,6 +19,9 @@ class WebhookLogResponse(BaseModel):
     id: int
     direction: Optional[str] = None
     phone_number_id: Optional[str] = None
+    wamid: Optional[str] = None
+    wa_from: Optional[str] = None
+    event_status: Optional[str] = None
     status: Optional[str] = None
     error_message: Optional[str] = None
     payload: Optional[str] = None
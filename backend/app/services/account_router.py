@@ -0,0 +1,95 @@
+"""
+In-process routing table: phone_number_id -> immutable WhatsApp account snapshot.
+Loaded on LISTEN connect, invalidated per number via NOTIFY when accounts change,
+and fully reloaded every `account_cache_ttl` seconds as a backstop.
+"""
+import time
+from typing import NamedTuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.whatsapp import WhatsAppAccount
+from app.services.pg_notify import pg_listener, ACCOUNT_ROUTING_CHANNEL
+
+
+class AccountSnapshot(NamedTuple):
+    id: str
+    user_id: str
+    phone_number_id: str
+    access_token: str
+
+
+def _snapshot(a: WhatsAppAccount) -> AccountSnapshot:
+    return AccountSnapshot(a.id, a.user_id, a.phone_number_id, a.access_token)
+
+
+class AccountRouter:
+    def __init__(self, ttl: float, negative_ttl: float):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._routes: dict[str, AccountSnapshot] = {}
+        self._unknown: dict[str, float] = {}  # phone_number_id -> monotonic expiry of the negative entry
+        self._loaded_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    async def load(self) -> None:
+        """Replace the whole table with the active accounts."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(WhatsAppAccount).where(WhatsAppAccount.is_active == True))
+            routes = {a.phone_number_id: _snapshot(a) for a in result.scalars().all()}
+        self._routes = routes
+        self._unknown = {}
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self, phone_number_id: str = "") -> None:
+        """Drop one number (or, with no argument, mark the whole table stale)."""
+        if not phone_number_id:
+            self._loaded_at = 0.0
+            return
+        self._routes.pop(phone_number_id, None)
+        self._unknown.pop(phone_number_id, None)
+
+    async def resolve(self, db: AsyncSession, phone_number_ids: set[str]) -> dict[str, AccountSnapshot]:
+        """Snapshots for the known, active numbers. Only numbers not in memory cost a (single) query."""
+        now = time.monotonic()
+        if self.ttl and now - self._loaded_at > self.ttl:
+            await self.load()
+        found, missing = {}, []
+        for pnid in phone_number_ids:
+            snap = self._routes.get(pnid)
+            if snap is not None:
+                found[pnid] = snap
+            elif self._unknown.get(pnid, 0.0) <= now:
+                missing.append(pnid)
+        self.hits += len(found)
+        if missing:
+            self.misses += len(missing)
+            result = await db.execute(
+                select(WhatsAppAccount).where(
+                    WhatsAppAccount.phone_number_id.in_(missing),
+                    WhatsAppAccount.is_active == True,
+                )
+            )
+            for a in result.scalars().all():
+                found[a.phone_number_id] = self._routes[a.phone_number_id] = _snapshot(a)
+            for pnid in missing:
+                if pnid not in found:
+                    self._unknown[pnid] = now + self.negative_ttl
+        return found
+
+    def stats(self) -> dict:
+        return {
+            "routes": len(self._routes),
+            "unknown_cached": len(self._unknown),
+            "hits": self.hits,
+            "misses": self.misses,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+        }
+
+
+account_router = AccountRouter(ttl=settings.account_cache_ttl, negative_ttl=settings.account_negative_ttl)
+pg_listener.subscribe(ACCOUNT_ROUTING_CHANNEL, account_router.invalidate)
+pg_listener.on_reconnect(account_router.load)
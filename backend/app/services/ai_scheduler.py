@@ -0,0 +1,172 @@
+"""
+Admission control for OpenAI requests.
+A global concurrency cap shared by all tenants, with fair queuing across user_ids (equal shares:
+a tenant's n-th queued request is tagged n past the current virtual time, and the lowest tag goes
+next), so a burst from one tenant queues behind its own requests, not everyone else's.
+The cap adapts AIMD-style: a 429 halves it and pauses dispatch for Retry-After, every success adds 1/cap.
+A burst of 429s is one congestion event: only requests dispatched after the last decrease can halve
+the cap again. Requests that end without an answer either way (cancelled, timed out) leave it alone.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerFull(Exception):
+    """The tenant already has the maximum number of queued requests."""
+
+
+class Slot:
+    """Handed to the caller while it holds a concurrency slot; report the outcome through it."""
+
+    __slots__ = ("scheduler", "dispatched_at", "ok", "throttled_for")
+
+    def __init__(self, scheduler: "AiScheduler", dispatched_at: float):
+        self.scheduler = scheduler
+        self.dispatched_at = dispatched_at
+        self.ok = False
+        self.throttled_for: float | None = None
+
+    def succeeded(self) -> None:
+        self.ok = True
+
+    def throttled(self, retry_after: float | None = None) -> None:
+        self.throttled_for = retry_after or settings.ai_throttle_pause
+
+
+class AiScheduler:
+    def __init__(self, max_concurrency: int, max_queued_per_tenant: int):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queued_per_tenant = max_queued_per_tenant
+        self.limit = float(self.max_concurrency)  # Adaptive cap, 1 .. max_concurrency
+        self.in_flight = 0
+        self._heap: list[tuple[float, int, asyncio.Future, str]] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_tag: dict[str, float] = {}
+        self._queued: dict[str, int] = {}
+        self._paused_until = 0.0
+        self._last_decrease = 0.0  # Monotonic time of the last halving
+        self._resume: asyncio.TimerHandle | None = None
+        self._waits: deque[float] = deque(maxlen=2000)
+        self.dispatched = 0
+        self.throttled = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self, user_id: str | None):
+        """Wait for a slot in fair order; raises SchedulerFull if the tenant's queue is full."""
+        await self._acquire(user_id or "")
+        slot = Slot(self, time.monotonic())
+        try:
+            yield slot
+        finally:
+            self._release(slot)
+
+    def _can_dispatch(self) -> bool:
+        return self.in_flight < int(self.limit) and time.monotonic() >= self._paused_until
+
+    async def _acquire(self, tenant: str) -> None:
+        start = time.monotonic()
+        if not self._heap and self._can_dispatch():
+            self.in_flight += 1
+            self.dispatched += 1
+            self._waits.append(0.0)
+            return
+        if self._queued.get(tenant, 0) >= self.max_queued_per_tenant:
+            self.rejected += 1
+            raise SchedulerFull(tenant)
+        tag = max(self._virtual_time, self._last_tag.get(tenant, 0.0)) + 1.0
+        self._last_tag[tenant] = tag
+        self._queued[tenant] = self._queued.get(tenant, 0) + 1
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (tag, next(self._seq), future, tenant))
+        self._pump()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(None)  # Granted just as the caller gave up; no signal for the cap
+            else:
+                # Cancelled or timed out while queued: stop counting it now; _pump skips the heap entry
+                future.cancel()
+                self._unqueue(tenant)
+            raise
+        self._waits.append(time.monotonic() - start)
+
+    def _release(self, slot: Slot | None) -> None:
+        self.in_flight -= 1
+        if slot is not None and slot.throttled_for is not None:
+            self.throttled += 1
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + slot.throttled_for)
+            # Requests sent before the last decrease saw the old cap: same congestion event
+            if slot.dispatched_at >= self._last_decrease:
+                self.limit = max(1.0, self.limit / 2)
+                self._last_decrease = now
+                logger.warning(
+                    "OpenAI throttled: concurrency cap now %d, pausing %.1fs", int(self.limit), slot.throttled_for
+                )
+        elif slot is not None and slot.ok:
+            self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+        self._pump()
+
+    def _pump(self) -> None:
+        """Grant slots to queued requests, lowest tag first."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            if self._resume is None:
+                self._resume = asyncio.get_running_loop().call_later(self._paused_until - now, self._unpause)
+            return
+        while self._heap and self.in_flight < int(self.limit):
+            tag, _, future, tenant = heapq.heappop(self._heap)
+            if future.done():
+                continue  # Caller cancelled while waiting; already unqueued
+            self._unqueue(tenant)
+            self._virtual_time = tag
+            self.in_flight += 1
+            self.dispatched += 1
+            future.set_result(None)
+        if len(self._last_tag) > 10_000:
+            # Tenants whose tags are behind virtual time are idle; their entry no longer matters
+            self._last_tag = {t: v for t, v in self._last_tag.items() if v > self._virtual_time}
+
+    def _unqueue(self, tenant: str) -> None:
+        self._queued[tenant] -= 1
+        if not self._queued[tenant]:
+            del self._queued[tenant]
+
+    def _unpause(self) -> None:
+        self._resume = None
+        self._pump()
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def pct(p: float) -> float | None:
+            return round(waits[min(int(p * len(waits)), len(waits) - 1)] * 1000, 1) if waits else None
+
+        busiest = sorted(self._queued.items(), key=lambda kv: kv[1], reverse=True)[:10]
+        return {
+            "limit": int(self.limit),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": sum(self._queued.values()),
+            "queued_by_tenant": dict(busiest),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "wait_ms": {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99)},
+            "dispatched": self.dispatched,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+        }
+
+
+ai_scheduler = AiScheduler(settings.ai_max_concurrency, settings.ai_max_queued_per_tenant)
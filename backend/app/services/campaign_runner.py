@@ -0,0 +1,242 @@
+"""
+Runs broadcast campaigns.
+Recipients are read with a server-side cursor (yield_per) into a small bounded queue, so memory
+stays flat however large the audience is. A fixed pool of workers sends through the outbound
+queue's per-number token bucket, and outcomes are written as multi-row inserts together with the
+campaign counters. Recipients already recorded are skipped, so a paused campaign resumes where it stopped.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from sqlalchemy import select, update, exists, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.campaign import Campaign, CampaignRecipient, CampaignStatus, CampaignAudience
+from app.models.lead import Lead, LeadStatus
+from app.models.message import Conversation
+from app.models.whatsapp import WhatsAppAccount
+from app.services.outbound_queue import outbound_queue, OutboundJob, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def audience_query(campaign: Campaign):
+    """Distinct wa_phone of the campaign's audience that have no recorded outcome yet."""
+    if campaign.audience == CampaignAudience.CONVERSATION_STAGE:
+        phone, q = Conversation.wa_phone, select(Conversation.wa_phone).where(
+            Conversation.user_id == campaign.user_id,
+            Conversation.current_stage == campaign.audience_value,
+        )
+    elif campaign.audience == CampaignAudience.LEAD_STATUS:
+        phone, q = Lead.wa_phone, select(Lead.wa_phone).distinct().where(
+            Lead.user_id == campaign.user_id,
+            Lead.status == LeadStatus(campaign.audience_value),
+        )
+    else:
+        raise ValueError(f"Unknown audience {campaign.audience!r}")
+    done = exists().where(
+        and_(CampaignRecipient.campaign_id == campaign.id, CampaignRecipient.wa_phone == phone)
+    )
+    return q.where(~done)
+
+
+class CampaignRun:
+    """In-process state of one running campaign (progress and throughput)."""
+
+    def __init__(self, campaign_id: str):
+        self.campaign_id = campaign_id
+        self.started = time.monotonic()
+        self.sent = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.task: asyncio.Task | None = None
+
+    def throughput(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return round((self.sent + self.failed) / elapsed, 2) if elapsed > 0 else 0.0
+
+
+class CampaignRunner:
+    def __init__(self, concurrency: int, fetch_size: int, batch_size: int, max_attempts: int):
+        self.concurrency = max(concurrency, 1)
+        self.fetch_size = fetch_size
+        self.batch_size = max(batch_size, 1)
+        self.max_attempts = max_attempts
+        self._runs: dict[str, CampaignRun] = {}
+
+    def start(self, campaign_id: str) -> None:
+        """Run a campaign already marked running in the database. No-op if it runs here already."""
+        if campaign_id in self._runs:
+            return
+        run = self._runs[campaign_id] = CampaignRun(campaign_id)
+        run.task = asyncio.create_task(self._run(run), name=f"campaign-{campaign_id}")
+
+    def progress(self, campaign_id: str) -> CampaignRun | None:
+        return self._runs.get(campaign_id)
+
+    async def cancel(self, campaign_id: str) -> None:
+        run = self._runs.get(campaign_id)
+        if run and run.task:
+            run.task.cancel()
+            await asyncio.gather(run.task, return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Stop every local run; they are marked paused and can be started again."""
+        runs = list(self._runs.values())
+        for run in runs:
+            run.task.cancel()
+        await asyncio.gather(*(r.task for r in runs), return_exceptions=True)
+        if runs:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    update(Campaign)
+                    .where(Campaign.id.in_([r.campaign_id for r in runs]), Campaign.status == CampaignStatus.RUNNING)
+                    .values(status=CampaignStatus.PAUSED)
+                )
+                await session.commit()
+
+    async def _run(self, run: CampaignRun) -> None:
+        try:
+            async with AsyncSessionLocal() as session:
+                campaign = await session.get(Campaign, run.campaign_id)
+                account = await session.get(WhatsAppAccount, campaign.account_id) if campaign else None
+            if campaign is None or account is None or not account.is_active:
+                logger.warning("Campaign %s has no usable WhatsApp account; pausing", run.campaign_id)
+                await self._finish(run.campaign_id, CampaignStatus.PAUSED)
+                return
+            await self._send_all(run, campaign, account)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Campaign %s failed; pausing", run.campaign_id)
+            await self._finish(run.campaign_id, CampaignStatus.PAUSED)
+        finally:
+            self._runs.pop(run.campaign_id, None)
+
+    async def _send_all(self, run: CampaignRun, campaign: Campaign, account: WhatsAppAccount) -> None:
+        phones: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results: list[dict] = []
+        flush_lock = asyncio.Lock()
+        stopped = asyncio.Event()  # Campaign no longer running (cancelled/paused from another request)
+
+        async def flush() -> None:
+            async with flush_lock:
+                if not results:
+                    return
+                batch = results[:]
+                results.clear()
+                if not await self._record(campaign.id, batch):
+                    stopped.set()
+
+        async def worker() -> None:
+            while True:
+                phone = await phones.get()
+                if phone is _DONE:
+                    return
+                if stopped.is_set():
+                    continue
+                run.in_flight += 1
+                try:
+                    outcome = await self._send(account, phone, campaign.body)
+                finally:
+                    run.in_flight -= 1
+                results.append(outcome)
+                if outcome["status"] == "sent":
+                    run.sent += 1
+                else:
+                    run.failed += 1
+                if len(results) >= self.batch_size:
+                    await flush()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            async with AsyncSessionLocal() as session:
+                stream = await session.stream(
+                    audience_query(campaign).execution_options(yield_per=self.fetch_size)
+                )
+                async for phone in stream.scalars():
+                    if stopped.is_set():
+                        break
+                    await phones.put(phone)  # Blocks while the workers are busy
+            for _ in workers:
+                await phones.put(_DONE)
+            await asyncio.gather(*workers)
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.shield(flush())
+        if not stopped.is_set():
+            await self._finish(campaign.id, CampaignStatus.COMPLETED)
+        logger.info("Campaign %s: sent=%s failed=%s (%.1f msg/s)", campaign.id, run.sent, run.failed, run.throughput())
+
+    async def _send(self, account: WhatsAppAccount, phone: str, body: str) -> dict:
+        job = OutboundJob(None, account.phone_number_id, account.access_token, phone, body)
+        while True:
+            job = job._replace(attempts=job.attempts + 1)
+            result = await outbound_queue.send(job)
+            if result.ok or not result.retryable or job.attempts >= self.max_attempts:
+                break
+            await asyncio.sleep(result.retry_after or backoff_delay(job.attempts))
+        return {
+            "wa_phone": phone,
+            "status": "sent" if result.ok else "failed",
+            "wa_message_id": result.wamid or None,
+            "error": result.error,
+            "attempts": job.attempts,
+            "sent_at": datetime.utcnow(),
+        }
+
+    @staticmethod
+    async def _record(campaign_id: str, batch: list[dict]) -> bool:
+        """Insert a batch of outcomes and bump the counters. Returns False if the campaign is no longer running."""
+        sent = sum(1 for r in batch if r["status"] == "sent")
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                pg_insert(CampaignRecipient)
+                .values([{"campaign_id": campaign_id, **r} for r in batch])
+                .on_conflict_do_nothing(index_elements=["campaign_id", "wa_phone"])
+            )
+            status = (await session.execute(
+                update(Campaign)
+                .where(Campaign.id == campaign_id)
+                .values(
+                    sent=Campaign.sent + sent,
+                    failed=Campaign.failed + (len(batch) - sent),
+                    updated_at=datetime.utcnow(),
+                )
+                .returning(Campaign.status)
+            )).scalar_one_or_none()
+            await session.commit()
+        return status == CampaignStatus.RUNNING
+
+    @staticmethod
+    async def _finish(campaign_id: str, status: str) -> None:
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(Campaign)
+                .where(Campaign.id == campaign_id, Campaign.status == CampaignStatus.RUNNING)
+                .values(status=status, finished_at=datetime.utcnow() if status == CampaignStatus.COMPLETED else None)
+            )
+            await session.commit()
+
+    def stats(self) -> dict:
+        return {
+            "running": {
+                cid: {"sent": r.sent, "failed": r.failed, "in_flight": r.in_flight, "per_second": r.throughput()}
+                for cid, r in self._runs.items()
+            },
+        }
+
+
+campaign_runner = CampaignRunner(
+    concurrency=settings.campaign_concurrency,
+    fetch_size=settings.campaign_fetch_size,
+    batch_size=settings.campaign_batch_size,
+    max_attempts=settings.outbound_max_attempts,
+)
@@ -0,0 +1,82 @@
+"""
+Recent turns per conversation, for AI prompts.
+Each conversation keeps its last N turns in a bounded in-memory ring buffer, written through to
+conversations.recent_context ({"seq": n, "turns": [[role, text], ...]}). The column arrives
+with the conversation row the handler already loads, so there is never an extra query. The
+seq counter tells a process whether its in-memory copy is stale (another process handled the
+contact since), in which case it reseeds from the column.
+"""
+from collections import OrderedDict, deque
+
+from app.config import settings
+from app.models.message import Conversation
+
+USER, ASSISTANT = "user", "assistant"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token, plus per-message overhead)."""
+    return len(text) // 4 + 4
+
+
+class ContextBuffers:
+    def __init__(self, turns: int, max_tokens: int, max_chars: int, capacity: int):
+        self.turns = turns
+        self.max_tokens = max_tokens
+        self.max_chars = max_chars
+        self.capacity = capacity
+        self._buffers: OrderedDict[str, tuple[int, deque]] = OrderedDict()  # conversation_id -> (seq, turns)
+        self.hits = 0
+        self.reseeds = 0
+
+    def _buffer(self, conv: Conversation) -> tuple[int, deque]:
+        stored = conv.recent_context or {}
+        seq = stored.get("seq", 0)
+        cached = self._buffers.get(conv.id)
+        if cached is not None and cached[0] == seq:
+            self._buffers.move_to_end(conv.id)
+            self.hits += 1
+            return cached
+        self.reseeds += 1
+        buf = deque((tuple(t) for t in stored.get("turns") or []), maxlen=self.turns)
+        self._set(conv.id, seq, buf)
+        return seq, buf
+
+    def _set(self, conversation_id: str, seq: int, buf: deque) -> None:
+        self._buffers[conversation_id] = (seq, buf)
+        self._buffers.move_to_end(conversation_id)
+        while len(self._buffers) > self.capacity:
+            self._buffers.popitem(last=False)
+
+    def history(self, conv: Conversation) -> list[dict]:
+        """Most recent turns as chat messages, oldest first, trimmed to the token budget."""
+        _, buf = self._buffer(conv)
+        out, budget = [], self.max_tokens
+        for role, text in reversed(buf):
+            budget -= estimate_tokens(text)
+            if budget < 0:
+                break
+            out.append({"role": role, "content": text})
+        out.reverse()
+        return out
+
+    def append(self, conv: Conversation, *turns: tuple[str, str]) -> None:
+        """Add turns and write the buffer through to the conversation row (saved with the transaction)."""
+        seq, buf = self._buffer(conv)
+        for role, text in turns:
+            if text:
+                buf.append((role, text[:self.max_chars]))
+        seq += 1
+        self._set(conv.id, seq, buf)
+        conv.recent_context = {"seq": seq, "turns": [list(t) for t in buf]}
+
+    def stats(self) -> dict:
+        return {"conversations": len(self._buffers), "capacity": self.capacity, "hits": self.hits, "reseeds": self.reseeds}
+
+
+conversation_context = ContextBuffers(
+    turns=settings.ai_context_turns,
+    max_tokens=settings.ai_context_max_tokens,
+    max_chars=settings.ai_context_max_chars,
+    capacity=settings.ai_context_cache_size,
+)
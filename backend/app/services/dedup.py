@@ -0,0 +1,45 @@
+"""
+In-process LRU of recently processed WhatsApp message ids (wamid).
+Front filter only: the unique index on messages.wa_message_id is the source of truth.
+"""
+from collections import OrderedDict
+from typing import Iterable
+
+from app.config import settings
+
+
+class RecentIdSet:
+    """Bounded set that forgets the least recently seen id first."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._ids: OrderedDict[str, None] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._ids:
+            self._ids.move_to_end(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, key: str) -> None:
+        self._ids[key] = None
+        self._ids.move_to_end(key)
+        if len(self._ids) > self.capacity:
+            self._ids.popitem(last=False)
+
+    def update(self, keys: Iterable[str]) -> None:
+        for k in keys:
+            self.add(k)
+
+    def stats(self) -> dict:
+        return {"size": len(self._ids), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
+
+
+seen_wamids = RecentIdSet(settings.dedup_cache_size)
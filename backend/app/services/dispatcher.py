@@ -0,0 +1,103 @@
+"""
+Per-contact ordered, cross-contact parallel job dispatcher.
+Each key (user_id, wa_phone) hashes onto one of N lanes. A lane runs its jobs strictly
+FIFO, one at a time; different lanes run in parallel up to max_concurrency.
+"""
+import asyncio
+import zlib
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.config import settings
+
+
+def _lane_hash(key: Hashable) -> int:
+    """Stable across processes (unlike hash() on str), so lane numbers are comparable between workers."""
+    if isinstance(key, tuple):
+        key = "\x1f".join(str(k) for k in key)
+    return zlib.crc32(str(key).encode("utf-8"))
+
+
+class ContactDispatcher:
+    def __init__(self, lanes: int, max_concurrency: int, lane_queue_size: int):
+        self.lanes = max(lanes, 1)
+        self.max_concurrency = max(min(max_concurrency, self.lanes), 1)
+        self.lane_queue_size = lane_queue_size
+        self._queues: list[asyncio.Queue] = []
+        self._tasks: list[asyncio.Task] = []
+        self._semaphore: asyncio.Semaphore | None = None
+        self._in_flight = 0
+        self._processed = [0] * self.lanes
+
+    def lane_for(self, key: Hashable) -> int:
+        return _lane_hash(key) % self.lanes
+
+    def _ensure_started(self) -> None:
+        # Lanes start lazily on first submit so scripts and tests can use the dispatcher without a lifespan
+        if self._tasks:
+            return
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._queues = [asyncio.Queue(maxsize=self.lane_queue_size) for _ in range(self.lanes)]
+        self._tasks = [
+            asyncio.create_task(self._run_lane(i), name=f"contact-lane-{i}") for i in range(self.lanes)
+        ]
+
+    async def submit(self, key: Hashable, job: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Queue `job` on the key's lane and wait for its result (exceptions propagate).
+        Blocks while the lane queue is full, which back-pressures the caller.
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queues[self.lane_for(key)].put((job, future))
+        return await future
+
+    async def _run_lane(self, index: int) -> None:
+        queue = self._queues[index]
+        while True:
+            job, future = await queue.get()
+            try:
+                async with self._semaphore:
+                    self._in_flight += 1
+                    try:
+                        result = await job()
+                    finally:
+                        self._in_flight -= 1
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._processed[index] += 1
+                queue.task_done()
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queues = []
+
+    def stats(self) -> dict:
+        """Queue depth per lane; a persistently deep lane with idle neighbours means N is too small."""
+        depths = [q.qsize() for q in self._queues] if self._queues else [0] * self.lanes
+        return {
+            "lanes": self.lanes,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queued": sum(depths),
+            "max_lane_depth": max(depths),
+            "lane_depths": depths,
+            "lane_processed": list(self._processed),
+        }
+
+
+contact_dispatcher = ContactDispatcher(
+    lanes=settings.dispatcher_lanes,
+    max_concurrency=settings.dispatcher_max_concurrency,
+    lane_queue_size=settings.dispatcher_lane_queue_size,
+)
@@ -0,0 +1,216 @@
+"""
+New-lead emails, sent off the webhook path.
+notify_new_lead only records the lead on the session; once the transaction commits it is queued
+here. A background task collects leads for EMAIL_DIGEST_SECONDS, looks up the recipients in one
+query and sends one email per user (a digest when several leads landed together) over a persistent,
+authenticated aiosmtplib connection that is reopened when the server drops it.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from email.message import EmailMessage
+from typing import NamedTuple
+
+import aiosmtplib
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class LeadEmail(NamedTuple):
+    user_id: str
+    lead_name: str
+    wa_phone: str
+    queued_at: float
+
+
+def smtp_configured() -> bool:
+    return bool(settings.smtp_user and settings.smtp_password)
+
+
+def compose(to_email: str, leads: list[LeadEmail]) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = settings.smtp_from
+    msg["To"] = to_email
+    if len(leads) == 1:
+        lead = leads[0]
+        msg["Subject"] = "New lead on WhatsApp"
+        msg.set_content(
+            f"A new lead came in from {lead.wa_phone}" + (f" ({lead.lead_name})" if lead.lead_name else "") + "."
+        )
+    else:
+        msg["Subject"] = f"{len(leads)} new leads on WhatsApp"
+        lines = [f"- {l.wa_phone}" + (f" ({l.lead_name})" if l.lead_name else "") for l in leads]
+        msg.set_content(f"{len(leads)} new leads came in:\n\n" + "\n".join(lines))
+    return msg
+
+
+class EmailDispatcher:
+    def __init__(self, digest_seconds: float, max_queue: int, idle_close: float):
+        self.digest_seconds = digest_seconds
+        self.max_queue = max_queue
+        self.idle_close = idle_close
+        self._queue: deque[LeadEmail] = deque()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._smtp: aiosmtplib.SMTP | None = None
+        self._latencies: deque[float] = deque(maxlen=1000)  # Lead created -> email accepted by the server
+        self.sent = 0
+        self.digests = 0
+        self.failed = 0
+        self.dropped = 0
+        self.connects = 0
+
+    def enqueue(self, lead: LeadEmail) -> None:
+        """Never blocks; drops (and counts) when the queue is full or SMTP is not configured."""
+        if not smtp_configured() or len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(lead)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="email-dispatcher")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final email flush failed")
+        await self._close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.idle_close or None)
+            except asyncio.TimeoutError:
+                await self._close()  # Idle: do not hold the SMTP session open forever
+                continue
+            self._wakeup.clear()
+            # Let a burst accumulate so it goes out as one digest per user
+            await asyncio.sleep(self.digest_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Email flush failed; retrying after the next window")
+                self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Send everything queued. If the lookup fails or the flush is cancelled, unsent leads go back to the queue."""
+        if not self._queue:
+            return
+        leads = list(self._queue)
+        self._queue.clear()
+        remaining: dict[str, list[LeadEmail]] = {}
+        for lead in leads:
+            remaining.setdefault(lead.user_id, []).append(lead)
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(select(User.id, User.email).where(User.id.in_(remaining)))
+                emails = {uid: email for uid, email in result.all() if email}
+            for user_id in list(remaining):
+                user_leads = remaining[user_id]
+                to_email = emails.get(user_id)
+                if to_email:
+                    if await self._send(compose(to_email, user_leads)):
+                        self.sent += 1
+                        self.digests += len(user_leads) > 1
+                        now = time.monotonic()
+                        self._latencies.extend(now - l.queued_at for l in user_leads)
+                    else:
+                        self.failed += 1
+                del remaining[user_id]
+        except BaseException:
+            # Ahead of anything enqueued meanwhile, in the original order
+            self._queue.extendleft(reversed([l for l in leads if l.user_id in remaining]))
+            raise
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        if self._smtp is not None and self._smtp.is_connected:
+            return self._smtp
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.smtp_host,
+            port=settings.smtp_port,
+            use_tls=settings.smtp_port == 465,  # Implicit TLS; other ports upgrade with STARTTLS
+            timeout=settings.smtp_timeout,
+        )
+        await smtp.connect()
+        await smtp.login(settings.smtp_user, settings.smtp_password)
+        self.connects += 1
+        self._smtp = smtp
+        return smtp
+
+    async def _close(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+    async def _send(self, msg: EmailMessage) -> bool:
+        """Send over the shared connection; reconnect and retry once if the server dropped it."""
+        for attempt in (1, 2):
+            try:
+                smtp = await self._connect()
+                await smtp.send_message(msg)
+                return True
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, ConnectionError) as e:
+                await self._close()
+                if attempt == 2:
+                    logger.warning("Email to %s failed after reconnect: %s", msg["To"], e)
+            except Exception as e:
+                await self._close()
+                logger.warning("Email to %s failed: %s: %s", msg["To"], e.__class__.__name__, e)
+                return False
+        return False
+
+    def stats(self) -> dict:
+        lat = sorted(self._latencies)
+
+        def pct(p: float) -> float | None:
+            return round(lat[min(int(p * len(lat)), len(lat) - 1)], 3) if lat else None
+
+        return {
+            "configured": smtp_configured(),
+            "queued": len(self._queue),
+            "oldest_queued_s": round(time.monotonic() - self._queue[0].queued_at, 2) if self._queue else None,
+            "connected": self._smtp is not None and self._smtp.is_connected,
+            "connects": self.connects,
+            "sent": self.sent,
+            "digests": self.digests,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "latency_s": {"p50": pct(0.5), "p95": pct(0.95)},
+        }
+
+
+email_dispatcher = EmailDispatcher(
+    digest_seconds=settings.email_digest_seconds,
+    max_queue=settings.email_queue_max,
+    idle_close=settings.smtp_idle_close,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_committed_lead_emails(session: Session) -> None:
+    for lead in session.info.pop("pending_lead_emails", None) or ():
+        email_dispatcher.enqueue(lead)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_lead_emails(session: Session) -> None:
+    session.info.pop("pending_lead_emails", None)
@@ -0,0 +1,137 @@
+"""
+Live dashboard events (new notification, new message, stage change) pushed to browsers over SSE.
+Producers stage events on the session; `flush(db)` turns them into NOTIFYs on APP_EVENTS_CHANNEL
+inside the same transaction, so every process (this one included) hears them exactly when the
+transaction commits and fans them out to its local subscribers. Without a LISTEN connection
+(PG_LISTEN_ENABLED=false) events are published locally after commit instead.
+"""
+import asyncio
+import json
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.pg_notify import notify, pg_listener, APP_EVENTS_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+MAX_PAYLOAD = 7000  # Postgres rejects NOTIFY payloads of 8000 bytes or more
+PREVIEW_CHARS = 200  # Message bodies are truncated; the UI fetches the full conversation
+
+# Event types
+NOTIFICATION = "notification"
+MESSAGE = "message"
+STAGE = "stage"
+RESYNC = "resync"  # Events may have been missed: refetch
+
+
+def preview(text: str | None) -> str:
+    return (text or "")[:PREVIEW_CHARS]
+
+
+def iso(value: datetime | None) -> str:
+    return (value or datetime.utcnow()).isoformat()
+
+
+class EventBus:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    def stage(self, db: AsyncSession, user_id: str, data: dict) -> None:
+        """Publish `data` to `user_id`'s dashboards once `db` commits (after `flush`)."""
+        db.info.setdefault("pending_events", []).append([user_id, data])
+
+    async def flush(self, db: AsyncSession) -> None:
+        """Queue the staged events as NOTIFYs in `db`'s transaction; call before commit."""
+        if not pg_listener.enabled:
+            return  # Published locally by the after_commit hook
+        events = db.info.pop("pending_events", None)
+        chunk, size = [], 2
+        for item in events or ():
+            encoded = json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+            if chunk and size + len(encoded.encode()) + 1 > MAX_PAYLOAD:
+                await notify(db, APP_EVENTS_CHANNEL, "[" + ",".join(chunk) + "]")
+                chunk, size = [], 2
+            chunk.append(encoded)
+            size += len(encoded.encode()) + 1
+        if chunk:
+            await notify(db, APP_EVENTS_CHANNEL, "[" + ",".join(chunk) + "]")
+
+    def publish(self, user_id: str, data: dict) -> None:
+        """Deliver to this process's subscribers of `user_id`."""
+        self.published += 1
+        for queue in self._subscribers.get(user_id, ()):
+            self._offer(queue, data)
+
+    def _offer(self, queue: asyncio.Queue, data: dict) -> None:
+        try:
+            queue.put_nowait(data)
+            self.delivered += 1
+        except asyncio.QueueFull:
+            # Slow client: replace its backlog with one resync instead of blocking producers
+            self.overflows += 1
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": RESYNC})
+
+    def on_notify(self, payload: str) -> None:
+        try:
+            items = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed %s payload", APP_EVENTS_CHANNEL)
+            return
+        for user_id, data in items:
+            self.publish(user_id, data)
+
+    def resync_all(self) -> None:
+        """After a LISTEN reconnect events may have been lost; every open stream refetches."""
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._offer(queue, {"type": RESYNC})
+
+    @contextmanager
+    def subscribe(self, user_id: str):
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._subscribers),
+            "streams": sum(len(q) for q in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+
+event_bus = EventBus(settings.event_stream_queue_size)
+pg_listener.subscribe(APP_EVENTS_CHANNEL, event_bus.on_notify)
+pg_listener.on_reconnect(event_bus.resync_all)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_events(session: Session) -> None:
+    for user_id, data in session.info.pop("pending_events", None) or ():
+        event_bus.publish(user_id, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_events(session: Session) -> None:
+    session.info.pop("pending_events", None)
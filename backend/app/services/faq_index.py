@@ -0,0 +1,221 @@
+"""
+Per-tenant FAQ matcher answered locally, in front of the AI.
+Each question phrasing becomes a TF-IDF vector over hashed character trigrams plus whole words
+(robust to typos and word order). A tenant's vectors are stored as one sparse row matrix in NumPy
+arrays, so matching a message is a handful of vectorized operations: sub-millisecond, no network.
+Entry changes are NOTIFYed as "user_id:faq_id"; only changed entries are re-read and re-tokenized,
+then the tenant's matrix is reassembled (O(non-zeros)).
+"""
+import logging
+import time
+import zlib
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.faq import FaqEntry
+from app.services.pg_notify import pg_listener, FAQ_CHANNEL
+from app.services.reply_cache import normalize
+
+logger = logging.getLogger(__name__)
+
+DIM = 1 << 14  # Hashed feature space; collisions are rare at FAQ vocabulary sizes
+
+
+def features(text: str) -> tuple[np.ndarray, np.ndarray]:
+    """(sorted unique feature ids, sublinear term frequencies) of a text."""
+    tokens = []
+    for word in normalize(text).split():
+        tokens.append("w:" + word)
+        padded = f" {word} "
+        tokens.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    if not tokens:
+        return np.empty(0, np.int32), np.empty(0, np.float32)
+    hashed = np.fromiter((zlib.crc32(t.encode()) & (DIM - 1) for t in tokens), np.int32, len(tokens))
+    ids, counts = np.unique(hashed, return_counts=True)
+    return ids, (1.0 + np.log(counts)).astype(np.float32)
+
+
+class FaqMatch(NamedTuple):
+    faq_id: str
+    answer: str
+    score: float
+
+
+class TenantIndex:
+    """Sparse (CSR) matrix of L2-normalized TF-IDF rows, one row per question phrasing."""
+
+    def __init__(self):
+        self.entries: dict[str, tuple[str, list[tuple[np.ndarray, np.ndarray]]]] = {}  # id -> (answer, rows)
+        self._row_entry: list[str] = []
+        self._idf = np.ones(DIM, np.float32)
+        self._indices = np.empty(0, np.int32)
+        self._data = np.empty(0, np.float32)
+        self._starts = np.empty(0, np.int64)
+
+    def set_entry(self, entry: FaqEntry) -> None:
+        rows = [features(q) for q in entry.question.splitlines() if q.strip()]
+        self.entries[entry.id] = (entry.answer, [r for r in rows if r[0].size])
+
+    def remove_entry(self, faq_id: str) -> None:
+        self.entries.pop(faq_id, None)
+
+    def build(self) -> None:
+        row_entry, ids, tfs = [], [], []
+        for faq_id, (_, rows) in self.entries.items():
+            for fid, tf in rows:
+                row_entry.append(faq_id)
+                ids.append(fid)
+                tfs.append(tf)
+        self._row_entry = row_entry
+        if not ids:
+            self._indices = np.empty(0, np.int32)
+            self._data = np.empty(0, np.float32)
+            self._starts = np.empty(0, np.int64)
+            return
+        lengths = np.fromiter((a.size for a in ids), np.int64, len(ids))
+        indices = np.concatenate(ids)
+        df = np.bincount(indices, minlength=DIM)  # Feature ids are unique within a row
+        n = len(ids)
+        self._idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+        data = np.concatenate(tfs) * self._idf[indices]
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        norms = np.sqrt(np.add.reduceat(data * data, starts))
+        data /= np.repeat(norms, lengths)
+        self._indices, self._data, self._starts = indices, data, starts
+
+    def match(self, text: str) -> tuple[str | None, float]:
+        """Best (faq_id, cosine similarity) for `text`."""
+        if not self._row_entry:
+            return None, 0.0
+        ids, tf = features(text)
+        if not ids.size:
+            return None, 0.0
+        weights = tf * self._idf[ids]
+        query = np.zeros(DIM, np.float32)
+        query[ids] = weights / np.linalg.norm(weights)
+        scores = np.add.reduceat(self._data * query[self._indices], self._starts)
+        best = int(np.argmax(scores))
+        return self._row_entry[best], float(scores[best])
+
+    def answer(self, faq_id: str) -> str:
+        return self.entries[faq_id][0]
+
+
+class FaqIndexCache:
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._tenants: dict[str, TenantIndex] = {}
+        self._dirty: dict[str, set[str]] = {}  # user_id -> faq ids changed since the index was built
+        # Tenants whose first full load is awaiting its query, and those invalidated meanwhile
+        self._loading: dict[str, int] = {}
+        self._stale_loads: set[str] = set()
+        self.lookups = 0
+        self.hits = 0
+        self.builds = 0
+        self.build_ms = 0.0
+        self.match_ms = 0.0
+
+    async def _index(self, db: AsyncSession, user_id: str) -> TenantIndex:
+        index = self._tenants.get(user_id)
+        dirty = self._dirty.pop(user_id, None)
+        if index is not None and not dirty:
+            return index
+        if index is None:
+            # First use in this process: one query for all of the tenant's entries (possibly none).
+            # Invalidations arriving meanwhile are kept (see invalidate), not lost to the snapshot.
+            self._loading[user_id] = self._loading.get(user_id, 0) + 1
+            try:
+                result = await db.execute(
+                    select(FaqEntry).where(FaqEntry.user_id == user_id, FaqEntry.is_active == True)
+                )
+            finally:
+                self._loading[user_id] -= 1
+                if not self._loading[user_id]:
+                    del self._loading[user_id]
+            index = TenantIndex()
+            changed = result.scalars().all()
+        else:
+            try:
+                result = await db.execute(
+                    select(FaqEntry).where(FaqEntry.id.in_(dirty), FaqEntry.user_id == user_id)
+                )
+            except Exception:
+                self._dirty.setdefault(user_id, set()).update(dirty)  # Retry on next use
+                raise
+            changed = result.scalars().all()
+            for faq_id in dirty:
+                index.remove_entry(faq_id)
+        start = time.perf_counter()
+        for entry in changed:
+            if entry.is_active:
+                index.set_entry(entry)
+        index.build()
+        self.builds += 1
+        self.build_ms += (time.perf_counter() - start) * 1000
+        if user_id in self._stale_loads:
+            # Dropped wholesale while loading: use the snapshot once, reload on next use
+            if user_id not in self._loading:
+                self._stale_loads.discard(user_id)
+            return index
+        self._tenants[user_id] = index
+        return index
+
+    async def match(self, db: AsyncSession, user_id: str, text: str) -> FaqMatch | None:
+        """The tenant's best FAQ answer for `text` if it scores at least the threshold."""
+        index = await self._index(db, user_id)
+        if not index.entries or not text.strip():
+            return None
+        self.lookups += 1
+        start = time.perf_counter()
+        faq_id, score = index.match(text)
+        self.match_ms += (time.perf_counter() - start) * 1000
+        if faq_id is None or score < self.threshold:
+            return None
+        self.hits += 1
+        return FaqMatch(faq_id, index.answer(faq_id), score)
+
+    async def best(self, db: AsyncSession, user_id: str, text: str) -> FaqMatch | None:
+        """Best match regardless of the threshold (for tuning)."""
+        index = await self._index(db, user_id)
+        faq_id, score = index.match(text)
+        return FaqMatch(faq_id, index.answer(faq_id), score) if faq_id else None
+
+    def invalidate(self, payload: str = "") -> None:
+        """NOTIFY payload is "user_id:faq_id"; an empty payload drops every index."""
+        if not payload:
+            self._tenants.clear()
+            self._dirty.clear()
+            self._stale_loads.update(self._loading)
+            return
+        user_id, _, faq_id = payload.partition(":")
+        loading = user_id in self._loading
+        if user_id not in self._tenants and not loading:
+            return  # Loaded in full on first use
+        if faq_id:
+            # Also while the first load is in flight: its snapshot may predate this change
+            self._dirty.setdefault(user_id, set()).add(faq_id)
+        else:
+            self._tenants.pop(user_id, None)
+            if loading:
+                self._stale_loads.add(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "tenants": len(self._tenants),
+            "entries": sum(len(t.entries) for t in self._tenants.values()),
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "builds": self.builds,
+            "avg_build_ms": round(self.build_ms / self.builds, 3) if self.builds else None,
+            "avg_match_ms": round(self.match_ms / self.lookups, 4) if self.lookups else None,
+        }
+
+
+faq_index = FaqIndexCache(settings.faq_match_threshold)
+pg_listener.subscribe(FAQ_CHANNEL, faq_index.invalidate)
+pg_listener.on_reconnect(faq_index.invalidate)
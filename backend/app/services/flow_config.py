@@ -0,0 +1,116 @@
+"""
+Compiled, immutable per-tenant conversation flows, cached in memory.
+Each ConversationConfig row carries a version; PATCH /api/settings/conversation-flow bumps it
+and NOTIFYs every process, which drops its stale copy. Resolving the step for a stage
+is then a dict lookup with no query and no allocation.
+A NOTIFY that arrives while a tenant's row is being loaded keeps the loaded (possibly older)
+flow out of the cache, and entries expire after FLOW_CONFIG_TTL seconds as a backstop for
+notifications missed while the LISTEN connection was down.
+"""
+import logging
+import time
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.conversation import ConversationConfig
+from app.services.flow_engine import (
+    CompiledFlow, FlowError, compile_config, legacy_flow_definition, compile_flow, ai_options,
+)
+from app.services.pg_notify import pg_listener, FLOW_CONFIG_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+
+def _compile(config: ConversationConfig | None, user_id: str) -> CompiledFlow:
+    try:
+        return compile_config(config, user_id)
+    except FlowError:
+        # Definitions are validated on save; a bad stored one must not take message processing down
+        logger.exception("Invalid flow for user %s; using the classic flow", user_id)
+        return compile_flow(legacy_flow_definition(config), user_id, config.version or 0, **ai_options(config))
+
+
+class FlowConfigCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._configs: dict[str, tuple[CompiledFlow, float]] = {}  # user_id -> (flow, monotonic expiry)
+        # Tenants whose row is being loaded, and the newest version NOTIFYed meanwhile (None: unknown)
+        self._loading: dict[str, int] = {}
+        self._stale_loads: dict[str, int | None] = {}
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    async def get_many(self, db: AsyncSession, user_ids: set[str]) -> dict[str, CompiledFlow]:
+        """Compiled flows for `user_ids`; only tenants not in memory cost a (single) query."""
+        found = {}
+        missing = []
+        now = time.monotonic()
+        for uid in user_ids:
+            entry = self._configs.get(uid)
+            if entry is None or entry[1] < now:
+                missing.append(uid)
+            else:
+                found[uid] = entry[0]
+        self.hits += len(found)
+        if missing:
+            self.misses += len(missing)
+            for uid in missing:
+                self._loading[uid] = self._loading.get(uid, 0) + 1
+            try:
+                result = await db.execute(select(ConversationConfig).where(ConversationConfig.user_id.in_(missing)))
+                rows = {c.user_id: c for c in result.scalars().all()}
+            finally:
+                for uid in missing:
+                    self._loading[uid] -= 1
+                    if not self._loading[uid]:
+                        del self._loading[uid]
+            expiry = time.monotonic() + self.ttl
+            for uid in missing:
+                # Tenants without a row get the defaults, cached too
+                compiled = found[uid] = _compile(rows.get(uid), uid)
+                if uid in self._stale_loads:
+                    notified = self._stale_loads[uid]
+                    if uid not in self._loading:
+                        del self._stale_loads[uid]
+                    if notified is None or compiled.version < notified:
+                        # Changed while loading: use it for this batch only, reload on next use
+                        self.discarded += 1
+                        continue
+                self._configs[uid] = (compiled, expiry)
+        return found
+
+    def invalidate(self, payload: str = "") -> None:
+        """NOTIFY payload is "user_id:version"; an empty payload clears everything."""
+        if not payload:
+            self._configs.clear()
+            self._stale_loads.update(dict.fromkeys(self._loading))
+            return
+        user_id, _, version = payload.partition(":")
+        try:
+            v = int(version)
+        except ValueError:
+            v = None
+        if user_id in self._loading:
+            previous = self._stale_loads.get(user_id, 0)
+            self._stale_loads[user_id] = None if v is None or previous is None else max(v, previous)
+        entry = self._configs.get(user_id)
+        if entry is None:
+            return
+        if v is not None and entry[0].version >= v:
+            return  # Already have this version (or a newer one)
+        self._configs.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "tenants": len(self._configs),
+            "hits": self.hits,
+            "misses": self.misses,
+            "discarded": self.discarded,
+        }
+
+
+flow_configs = FlowConfigCache(settings.flow_config_ttl)
+pg_listener.subscribe(FLOW_CONFIG_CHANNEL, flow_configs.invalidate)
+pg_listener.on_reconnect(flow_configs.invalidate)
@@ -0,0 +1,198 @@
+"""
+Table-driven conversation flow.
+A tenant's flow is a declarative list of stages (stored as JSON on ConversationConfig.flow);
+tenants without one get the classic NEW -> ASK_NAME -> ASK_REQUIREMENT -> ASK_CONTACT -> DONE flow
+built from the msg_* / ai_fallback_* columns. Either way the definition is compiled once into
+parallel tuples indexed by stage number, so handling a message is one dict lookup plus array reads.
+
+Stage definition (what happens when a message arrives while the conversation is in that stage):
+    name         unique stage name (stored in conversations.current_stage)
+    next         stage to move to (default: stay)
+    reply        text to send back
+    ai           "off" | "fallback" (AI only if reply is blank) | "first" (AI, reply if AI fails)
+    ai_context   hint passed to the model
+    capture      slot name to store the message text under (conversations.slots)
+    reset_slots  clear captured slots first (e.g. on the entry stage)
+    create_lead  create a Lead from the slots and mark the conversation complete
+"""
+from typing import NamedTuple
+
+from app.models.conversation import ConversationConfig
+
+STAGES = ("NEW", "ASK_NAME", "ASK_REQUIREMENT", "ASK_CONTACT", "DONE")
+
+# Default messages (used when user has not customized)
+DEFAULTS = {
+    "NEW": "Hi! Thanks for reaching out. What is your name?",
+    "ASK_NAME": "Thanks! What do you need help with?",
+    "ASK_REQUIREMENT": "Please share your contact (phone or email) so we can get back to you.",
+    "ASK_CONTACT": "Thank you! We have noted your details and will contact you soon.",
+    "DONE": "Is there anything else we can help with?",
+}
+
+AI_OFF, AI_FALLBACK, AI_FIRST = 0, 1, 2
+_AI_MODES = {"off": AI_OFF, "fallback": AI_FALLBACK, "first": AI_FIRST}
+
+MAX_STAGES = 50
+
+
+class FlowError(ValueError):
+    """Raised when a flow definition cannot be compiled."""
+
+
+class Step(NamedTuple):
+    """Everything the handler needs to process one message in a given stage."""
+    next_stage: str
+    reply: str
+    ai_mode: int
+    ai_context: str
+    capture: str | None
+    reset_slots: bool
+    create_lead: bool
+
+
+class CompiledFlow:
+    """Immutable transition table; `steps[i]` describes stage `names[i]`."""
+
+    __slots__ = ("user_id", "version", "names", "steps", "ai_budget_ms", "ai_followup", "_index", "_fallback")
+
+    def __init__(
+        self,
+        user_id: str | None,
+        version: int,
+        names: tuple,
+        steps: tuple,
+        fallback: int,
+        ai_budget_ms: int | None = None,
+        ai_followup: bool = False,
+    ):
+        self.user_id = user_id
+        self.version = version
+        self.names = names
+        self.steps = steps
+        self.ai_budget_ms = ai_budget_ms  # None = global default
+        self.ai_followup = ai_followup
+        self._index = {name: i for i, name in enumerate(names)}
+        self._fallback = fallback
+
+    @property
+    def start(self) -> str:
+        return self.names[0]
+
+    def step(self, stage: str) -> Step:
+        """Transition for a message received in `stage`; unknown stages use the fallback stage."""
+        return self.steps[self._index.get(stage, self._fallback)]
+
+
+def compile_flow(
+    definition: dict,
+    user_id: str | None = None,
+    version: int = 0,
+    ai_budget_ms: int | None = None,
+    ai_followup: bool = False,
+) -> CompiledFlow:
+    """Validate a flow definition and compile it. The start stage is always index 0."""
+    stages = definition.get("stages") or []
+    if not stages:
+        raise FlowError("Flow needs at least one stage")
+    if len(stages) > MAX_STAGES:
+        raise FlowError(f"Flow can have at most {MAX_STAGES} stages")
+    by_name = {}
+    for s in stages:
+        name = (s.get("name") or "").strip()
+        if not name or len(name) > 32:
+            raise FlowError("Every stage needs a name of 1-32 characters")
+        if name in by_name:
+            raise FlowError(f"Duplicate stage {name!r}")
+        by_name[name] = s
+    start = definition.get("start") or stages[0]["name"]
+    if start not in by_name:
+        raise FlowError(f"Start stage {start!r} is not defined")
+    names = (start,) + tuple(n for n in by_name if n != start)
+
+    steps = []
+    for name in names:
+        s = by_name[name]
+        nxt = s.get("next") or name
+        if nxt not in by_name:
+            raise FlowError(f"Stage {name!r} moves to undefined stage {nxt!r}")
+        ai = s.get("ai") or "off"
+        if ai not in _AI_MODES:
+            raise FlowError(f"Stage {name!r}: ai must be one of {', '.join(_AI_MODES)}")
+        steps.append(Step(
+            next_stage=nxt,
+            reply=s.get("reply") or "",
+            ai_mode=_AI_MODES[ai],
+            ai_context=s.get("ai_context") or "",
+            capture=s.get("capture") or None,
+            reset_slots=bool(s.get("reset_slots")),
+            create_lead=bool(s.get("create_lead")),
+        ))
+
+    fallback = definition.get("fallback_stage") or names[-1]
+    if fallback not in by_name:
+        raise FlowError(f"Fallback stage {fallback!r} is not defined")
+    return CompiledFlow(user_id, version, names, tuple(steps), names.index(fallback), ai_budget_ms, ai_followup)
+
+
+def legacy_flow_definition(config: ConversationConfig | None) -> dict:
+    """
+    The classic five-stage flow from the msg_* / ai_fallback_* columns.
+    Each stage replies with the *next* stage's message, and DONE consults the AI before its message.
+    """
+    msgs = dict.fromkeys(STAGES)
+    ai = dict.fromkeys(STAGES, False)
+    if config is not None:
+        msgs.update(
+            NEW=config.msg_new,
+            ASK_NAME=config.msg_ask_name,
+            ASK_REQUIREMENT=config.msg_ask_requirement,
+            ASK_CONTACT=config.msg_ask_contact,
+            DONE=config.msg_done,
+        )
+        ai.update(
+            NEW=config.ai_fallback_new,
+            ASK_NAME=config.ai_fallback_ask_name,
+            ASK_REQUIREMENT=config.ai_fallback_ask_requirement,
+            ASK_CONTACT=config.ai_fallback_ask_contact,
+            DONE=config.ai_fallback_done,
+        )
+    msg = {stage: msgs[stage] or DEFAULTS[stage] for stage in STAGES}
+
+    def fallback(stage: str) -> str:
+        return "fallback" if ai[stage] else "off"
+
+    return {
+        "start": "NEW",
+        "fallback_stage": "DONE",
+        "stages": [
+            {"name": "NEW", "next": "ASK_NAME", "reply": msg["ASK_NAME"], "reset_slots": True,
+             "ai": fallback("NEW"), "ai_context": "Business first reply."},
+            {"name": "ASK_NAME", "next": "ASK_REQUIREMENT", "reply": msg["ASK_REQUIREMENT"], "capture": "name",
+             "ai": fallback("ASK_NAME"), "ai_context": "Customer just gave name."},
+            {"name": "ASK_REQUIREMENT", "next": "ASK_CONTACT", "reply": msg["ASK_CONTACT"], "capture": "requirement",
+             "ai": fallback("ASK_REQUIREMENT"), "ai_context": "Customer stated requirement."},
+            {"name": "ASK_CONTACT", "next": "DONE", "reply": msg["DONE"], "capture": "contact", "create_lead": True,
+             "ai": fallback("ASK_CONTACT"), "ai_context": "Customer gave contact."},
+            {"name": "DONE", "next": "DONE", "reply": msg["DONE"],
+             "ai": "first" if ai["DONE"] else "off", "ai_context": "Follow-up in completed conversation."},
+        ],
+    }
+
+
+def ai_options(config: ConversationConfig | None) -> dict:
+    """Tenant-level AI settings carried on the compiled flow."""
+    if config is None:
+        return {}
+    return {"ai_budget_ms": config.ai_reply_budget_ms, "ai_followup": bool(config.ai_followup)}
+
+
+def compile_config(config: ConversationConfig | None, user_id: str | None = None) -> CompiledFlow:
+    """Compile a tenant's custom flow, or the classic flow from its per-stage columns."""
+    version = (config.version or 0) if config is not None else 0
+    user_id = config.user_id if config is not None else user_id
+    definition = config.flow if config is not None and config.flow else legacy_flow_definition(config)
+    return compile_flow(definition, user_id, version, **ai_options(config))
+
+
+DEFAULT_FLOW = compile_config(None)
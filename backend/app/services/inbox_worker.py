@@ -0,0 +1,177 @@
+"""
+Background workers that drain the webhook inbox.
+Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers
+across uvicorn processes or nodes can share the same table without double-processing.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, or_, and_
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.inbox import WebhookInbox, InboxStatus
+from app.services.webhook_handler import dispatch_incoming_message
+from app.services.status_pipeline import StatusUpdate, extract_statuses, status_coalescer
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff for the given (1-based) attempt number, capped at one hour."""
+    seconds = settings.inbox_retry_base_seconds * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(seconds, 3600))
+
+
+async def claim_batch(limit: int) -> list[tuple[int, str, int]]:
+    """
+    Claim up to `limit` due rows in one statement and return (id, payload, attempts).
+    Pending rows whose retry time has come and processing rows whose lease expired are both eligible.
+    """
+    now = datetime.utcnow()
+    due = (
+        select(WebhookInbox.id)
+        .where(
+            or_(
+                and_(WebhookInbox.status == InboxStatus.PENDING, WebhookInbox.next_attempt_at <= now),
+                and_(WebhookInbox.status == InboxStatus.PROCESSING, WebhookInbox.locked_until < now),
+            )
+        )
+        .order_by(WebhookInbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(WebhookInbox)
+            .where(WebhookInbox.id.in_(due.scalar_subquery()))
+            .values(
+                status=InboxStatus.PROCESSING,
+                attempts=WebhookInbox.attempts + 1,
+                locked_until=now + timedelta(seconds=settings.inbox_lease_seconds),
+            )
+            .returning(WebhookInbox.id, WebhookInbox.payload, WebhookInbox.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        rows = sorted(result.all(), key=lambda r: r[0])
+        await session.commit()
+    return [(r[0], r[1], r[2]) for r in rows]
+
+
+async def _mark_failed(row_id: int, attempts: int, error: str, permanent: bool = False) -> None:
+    """Schedule a retry, or dead-letter the row when attempts are exhausted."""
+    dead = permanent or attempts >= settings.inbox_max_attempts
+    values = {"last_error": error[:2000], "locked_until": None}
+    if dead:
+        values["status"] = InboxStatus.DEAD
+    else:
+        values["status"] = InboxStatus.PENDING
+        values["next_attempt_at"] = datetime.utcnow() + _retry_delay(attempts)
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(WebhookInbox).where(WebhookInbox.id == row_id).values(**values))
+        await session.commit()
+
+
+async def process_status_rows(rows: list[tuple[int, list[StatusUpdate], int]]) -> bool:
+    """Apply the statuses of several status-only deliveries and delete their rows in one transaction."""
+    try:
+        async with AsyncSessionLocal() as session:
+            await status_coalescer.apply(session, [u for _, statuses, _ in rows for u in statuses])
+            await session.execute(delete(WebhookInbox).where(WebhookInbox.id.in_([r[0] for r in rows])))
+            await session.commit()
+        return True
+    except Exception as e:
+        logger.exception("Webhook inbox status rows %s failed", [r[0] for r in rows])
+        for row_id, _, attempts in rows:
+            await _mark_failed(row_id, attempts, str(e) or e.__class__.__name__)
+        return False
+
+
+async def process_inbox_row(row_id: int, raw: str, attempts: int) -> bool:
+    """Run the conversation flow for one delivery and delete the row on success."""
+    try:
+        payload = json.loads(raw) if raw else {}
+    except ValueError as e:
+        await _mark_failed(row_id, attempts, f"Invalid JSON: {e}", permanent=True)
+        return False
+    try:
+        if "entry" in payload:
+            # Contacts commit independently; a retry after a partial failure replays the whole delivery
+            await dispatch_incoming_message(payload)
+        statuses, _ = extract_statuses(payload)
+        async with AsyncSessionLocal() as session:
+            if statuses:
+                await status_coalescer.apply(session, statuses)
+            await session.execute(delete(WebhookInbox).where(WebhookInbox.id == row_id))
+            await session.commit()
+        return True
+    except Exception as e:
+        logger.exception("Webhook inbox row %s failed (attempt %s)", row_id, attempts)
+        await _mark_failed(row_id, attempts, str(e) or e.__class__.__name__)
+        return False
+
+
+class InboxWorkerPool:
+    """A fixed number of asyncio workers polling the inbox; `wake()` skips the poll delay."""
+
+    def __init__(self, workers: int, batch_size: int, poll_interval: float):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = False
+
+    def wake(self) -> None:
+        """Called after a local insert so an idle worker picks the row up immediately."""
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        self._stopping = False
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._run(), name=f"inbox-worker-{i}"))
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                rows = await claim_batch(self.batch_size)
+            except Exception:
+                logger.exception("Webhook inbox claim failed")
+                rows = []
+            # Status-only deliveries (the bulk of the traffic) are applied together
+            status_rows, other_rows = [], []
+            for row_id, raw, attempts in rows:
+                try:
+                    statuses, has_messages = extract_statuses(json.loads(raw))
+                except ValueError:
+                    statuses, has_messages = [], True
+                if has_messages:
+                    other_rows.append((row_id, raw, attempts))
+                else:
+                    status_rows.append((row_id, statuses, attempts))
+            if status_rows:
+                await process_status_rows(status_rows)
+            for row_id, raw, attempts in other_rows:
+                await process_inbox_row(row_id, raw, attempts)
+            if len(rows) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+
+inbox_workers = InboxWorkerPool(
+    workers=settings.inbox_workers,
+    batch_size=settings.inbox_batch_size,
+    poll_interval=settings.inbox_poll_interval,
+)
@@ -0,0 +1,113 @@
+"""
+Partition maintenance for webhook_logs: create daily partitions ahead of time and drop
+partitions older than the retention window. Dropping a partition is a metadata operation,
+so retention costs the same at a thousand rows or hundreds of millions. Rows that fell into
+the default partition (maintenance not running for a while) are deleted past the same cutoff.
+All days are UTC, matching created_at.
+"""
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "webhook_logs"
+DEFAULT_PARTITION = "webhook_logs_default"
+PARTITION_RE = re.compile(r"^webhook_logs_p(\d{8})$")
+# Arbitrary constant: only one process runs maintenance at a time
+ADVISORY_LOCK_KEY = 0x776C6F67
+
+
+def partition_name(day: date) -> str:
+    return f"{PARENT_TABLE}_p{day:%Y%m%d}"
+
+
+async def maintain_webhook_log_partitions(today: date | None = None) -> dict:
+    """Create missing partitions for today .. today+ahead and drop those past retention."""
+    today = today or datetime.utcnow().date()
+    cutoff = today - timedelta(days=settings.webhook_log_retention_days)
+    created, dropped, purged = [], [], 0
+    async with AsyncSessionLocal() as session:
+        got_lock = (await session.execute(text("SELECT pg_try_advisory_xact_lock(:k)"), {"k": ADVISORY_LOCK_KEY})).scalar()
+        if not got_lock:
+            return {"skipped": True, "created": created, "dropped": dropped, "purged": purged}
+        result = await session.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = CAST(:parent AS regclass)"
+            ),
+            {"parent": PARENT_TABLE},
+        )
+        existing = {r[0] for r in result.all()}
+
+        for i in range(settings.webhook_log_partitions_ahead + 1):
+            day = today + timedelta(days=i)
+            name = partition_name(day)
+            if name in existing:
+                continue
+            try:
+                async with session.begin_nested():
+                    await session.execute(
+                        text(
+                            f'CREATE TABLE "{name}" PARTITION OF {PARENT_TABLE} '
+                            f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                        )
+                    )
+                created.append(name)
+            except Exception:
+                # e.g. the default partition already holds rows for that day
+                logger.exception("Could not create partition %s", name)
+
+        for name in sorted(existing):
+            m = PARTITION_RE.match(name)
+            if not m:
+                continue  # Default partition
+            day = datetime.strptime(m.group(1), "%Y%m%d").date()
+            if day < cutoff:
+                await session.execute(text(f'DROP TABLE "{name}"'))
+                dropped.append(name)
+        if DEFAULT_PARTITION in existing:
+            result = await session.execute(
+                text(f'DELETE FROM "{DEFAULT_PARTITION}" WHERE created_at < :cutoff'),
+                {"cutoff": datetime.combine(cutoff, datetime.min.time())},
+            )
+            purged = result.rowcount or 0
+        await session.commit()
+    if created or dropped or purged:
+        logger.info("webhook_logs partitions created=%s dropped=%s default_rows_purged=%s", created, dropped, purged)
+    return {"skipped": False, "created": created, "dropped": dropped, "purged": purged}
+
+
+class LogRetentionTask:
+    """Runs partition maintenance at startup and then every `interval` seconds."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run(), name="webhook-log-retention")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await maintain_webhook_log_partitions()
+            except Exception:
+                logger.exception("webhook_logs partition maintenance failed")
+            await asyncio.sleep(self.interval)
+
+
+log_retention = LogRetentionTask(settings.webhook_log_maintenance_interval)
@@ -0,0 +1,169 @@
+"""
+Buffered writer for webhook_logs.
+Requests hand over the raw body and return; a background task compresses payloads, extracts
+the indexed lookup fields, and inserts buffered rows with one multi-row INSERT every
+`batch_size` rows or `flush_interval_ms`, whichever comes first.
+"""
+import asyncio
+import json
+import logging
+import zlib
+from collections import deque
+from datetime import datetime
+from sqlalchemy import insert
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.whatsapp import WebhookLog
+from app.services.webhook_handler import phone_number_id_of
+
+logger = logging.getLogger(__name__)
+
+
+def summarize_payload(raw: bytes) -> dict:
+    """Lookup fields of the first message or status in a delivery (all None if unparseable)."""
+    summary = {"phone_number_id": None, "wamid": None, "wa_from": None, "event_status": None}
+    try:
+        payload = json.loads(raw)
+        for entry in payload.get("entry", []) or []:
+            for change in entry.get("changes", []) or []:
+                value = change.get("value", {}) or {}
+                summary["phone_number_id"] = phone_number_id_of(value)
+                messages = value.get("messages") or []
+                statuses = value.get("statuses") or []
+                if messages:
+                    summary.update(wamid=messages[0].get("id"), wa_from=messages[0].get("from"), event_status="message")
+                    return summary
+                if statuses:
+                    summary.update(
+                        wamid=statuses[0].get("id"),
+                        wa_from=statuses[0].get("recipient_id"),
+                        event_status=statuses[0].get("status"),
+                    )
+                    return summary
+    except (ValueError, AttributeError, TypeError):
+        pass
+    return summary
+
+
+class WebhookLogWriter:
+    """
+    Bounded in-memory buffer of pending webhook_logs rows.
+    When full, overflow="drop_oldest" evicts the oldest pending row, "drop_newest" rejects the new one;
+    either way the request path never waits on logging.
+    """
+
+    def __init__(self, batch_size: int, flush_interval_ms: int, max_buffer: int, overflow: str):
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_buffer = max(max_buffer, self.batch_size)
+        self.overflow = overflow
+        self._buffer: deque[dict] = deque()
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def submit(
+        self,
+        raw: bytes,
+        status: str = "received",
+        direction: str = "inbound",
+        phone_number_id: str | None = None,
+        error_message: str | None = None,
+    ) -> None:
+        """Queue one log row. Never blocks and never raises."""
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            if self.overflow == "drop_newest":
+                return
+            self._buffer.popleft()
+        self._buffer.append({
+            "raw": raw,
+            "direction": direction,
+            "phone_number_id": phone_number_id,
+            "status": status,
+            "error_message": error_message,
+            "created_at": datetime.utcnow(),
+        })
+        if len(self._buffer) >= self.batch_size:
+            self._full.set()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="webhook-log-writer")
+
+    async def stop(self) -> None:
+        """Stop the background task and write whatever is still buffered."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while self._buffer:
+            if not await self.flush():
+                break
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            while self._buffer:
+                if not await self.flush():
+                    break
+                if len(self._buffer) < self.batch_size:
+                    break  # Partial batch: wait for more rows or the next tick
+
+    async def flush(self) -> bool:
+        """Insert up to one batch. Returns False if the insert failed (rows are dropped, not retried)."""
+        batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+        if not batch:
+            return True
+        rows = []
+        for r in batch:
+            summary = summarize_payload(r["raw"])
+            rows.append({
+                "payload_gz": zlib.compress(r["raw"], settings.webhook_log_compression_level),
+                "direction": r["direction"],
+                "phone_number_id": r["phone_number_id"] or summary["phone_number_id"],
+                "wamid": (summary["wamid"] or "")[:128] or None,
+                "wa_from": (summary["wa_from"] or "")[:32] or None,
+                "event_status": (summary["event_status"] or "")[:16] or None,
+                "status": r["status"],
+                "error_message": r["error_message"],
+                "created_at": r["created_at"],
+            })
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(insert(WebhookLog).values(rows))
+                await session.commit()
+        except Exception:
+            self.failed += len(rows)
+            logger.exception("Failed to write %s webhook log rows", len(rows))
+            return False
+        self.written += len(rows)
+        self.flushes += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "max_buffer": self.max_buffer,
+            "overflow": self.overflow,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+        }
+
+
+webhook_log_writer = WebhookLogWriter(
+    batch_size=settings.webhook_log_batch_size,
+    flush_interval_ms=settings.webhook_log_flush_ms,
+    max_buffer=settings.webhook_log_buffer,
+    overflow=settings.webhook_log_overflow,
+)
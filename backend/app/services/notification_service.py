@@ -1,15 +1,13 @@
 """
-Send email and create in-app notifications for new leads.
+In-app notifications and email alerts for new leads.
 """
+import time
 import uuid
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.config import settings
 from app.models.notification import Notification
-from app.models.user import User
-
-# Optional: aiosmtplib for async email
-# For simplicity we use sync in background; can switch to aiosmtplib
+from app.services.email_dispatcher import LeadEmail
+from app.services.event_bus import event_bus, NOTIFICATION, iso
 
 
 async def create_in_app_notification(
@@ -22,42 +20,23 @@ async def create_in_app_notification(
         title="New lead",
         body=f"Lead from {wa_phone}" + (f" ({lead_name})" if lead_name else ""),
         is_read=False,
+        created_at=datetime.utcnow(),
     )
     db.add(n)
-
-
-def _send_email_sync(to_email: str, subject: str, body: str) -> bool:
-    """Sync SMTP send. Returns True if sent successfully."""
-    if not settings.smtp_user or not settings.smtp_password:
-        return False
-    try:
-        import smtplib
-        from email.mime.text import MIMEText
-        from email.mime.multipart import MIMEMultipart
-        msg = MIMEMultipart()
-        msg["From"] = settings.smtp_from
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
-        with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
-            server.starttls()
-            server.login(settings.smtp_user, settings.smtp_password)
-            server.send_message(msg)
-        return True
-    except Exception:
-        return False
+    event_bus.stage(db, user_id, {
+        "type": NOTIFICATION,
+        "id": n.id,
+        "lead_id": lead_id,
+        "title": n.title,
+        "body": n.body,
+        "is_read": False,
+        "created_at": iso(n.created_at),
+    })
 
 
 async def notify_new_lead(db: AsyncSession, user_id: str, lead_id: str, lead_name: str, wa_phone: str) -> None:
-    """Create in-app notification and optionally send email to user."""
+    """Create in-app notification; the email is queued for the email dispatcher once the transaction commits."""
     await create_in_app_notification(db, user_id, lead_id, lead_name, wa_phone)
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    if user and user.email:
-        import asyncio
-        await asyncio.to_thread(
-            _send_email_sync,
-            user.email,
-            "New lead on WhatsApp",
-            f"A new lead came in from {wa_phone}" + (f" ({lead_name})" if lead_name else "") + ".",
-        )
+    db.info.setdefault("pending_lead_emails", []).append(
+        LeadEmail(user_id, lead_name, wa_phone, time.monotonic())
+    )
@@ -1,32 +1,145 @@
 """
 Optional AI fallback using OpenAI GPT-3.5/4 for unknown queries.
+Requests share one pooled client, are admitted fairly per tenant (services/ai_scheduler.py),
+and history-free answers to short questions are cached per tenant (services/reply_cache.py).
 """
+import asyncio
+import logging
 import httpx
 from app.config import settings
+from app.services.reply_cache import reply_cache
+from app.services.ai_scheduler import ai_scheduler, SchedulerFull
 
-OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+logger = logging.getLogger(__name__)
 
+_client: httpx.AsyncClient | None = None
+_counters = {"requests": 0, "errors": 0, "coalesced": 0, "uncached": 0, "budget_met": 0, "budget_missed": 0}
+# Identical cacheable (history-free) questions already waiting on the model share its answer
+_inflight: dict[tuple, asyncio.Future] = {}
 
-async def get_ai_reply(user_message: str, context: str = "") -> str:
-    """Call OpenAI and return a reply. Returns empty string if no key or error."""
-    if not settings.openai_api_key:
-        return ""
+
+def get_openai_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_connections,
+                keepalive_expiry=60.0,
+            ),
+            timeout=httpx.Timeout(settings.openai_timeout, connect=5.0),
+        )
+    return _client
+
+
+async def close_openai_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def ai_stats() -> dict:
+    return dict(_counters, inflight=len(_inflight), cache=reply_cache.stats(), scheduler=ai_scheduler.stats())
+
+
+def _retry_after(r: httpx.Response) -> float | None:
+    try:
+        return float(r.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+
+async def _complete(
+    user_message: str, context: str, user_id: str | None = None, history: list[dict] | None = None
+) -> str:
     payload = {
         "model": "gpt-3.5-turbo",
         "messages": [
             {"role": "system", "content": "You are a helpful WhatsApp business assistant. Reply briefly and professionally. " + (context or "")},
+            *(history or ()),
             {"role": "user", "content": user_message},
         ],
         "max_tokens": 150,
     }
     headers = {"Authorization": f"Bearer {settings.openai_api_key}", "Content-Type": "application/json"}
     try:
-        async with httpx.AsyncClient() as client:
-            r = await client.post(OPENAI_URL, json=payload, headers=headers, timeout=15.0)
-            if r.status_code != 200:
-                return ""
-            data = r.json()
-            choice = data.get("choices", [{}])[0]
-            return (choice.get("message", {}) or {}).get("content", "").strip() or ""
-    except Exception:
+        # Fair share of the global concurrency cap; 429s shrink the cap for everyone
+        async with ai_scheduler.slot(user_id) as slot:
+            _counters["requests"] += 1
+            r = await get_openai_client().post(
+                f"{settings.openai_base_url.rstrip('/')}/chat/completions", json=payload, headers=headers
+            )
+            if r.status_code == 429:
+                slot.throttled(_retry_after(r))
+            elif r.status_code == 200:
+                slot.succeeded()
+        if r.status_code != 200:
+            _counters["errors"] += 1
+            logger.warning("OpenAI returned HTTP %s: %s", r.status_code, r.text[:300])
+            return ""
+        data = r.json()
+        choice = data.get("choices", [{}])[0]
+        return (choice.get("message", {}) or {}).get("content", "").strip() or ""
+    except SchedulerFull:
+        return ""  # Tenant has too many requests queued; the static reply is used
+    except Exception as e:
+        _counters["errors"] += 1
+        logger.warning("OpenAI request failed: %s: %s", e.__class__.__name__, e)
+        return ""
+
+
+async def get_ai_reply(
+    user_message: str, context: str = "", user_id: str | None = None, history: list[dict] | None = None
+) -> str:
+    """
+    Call OpenAI (or the reply cache) and return a reply. Returns empty string if no key or error.
+    `history` is the conversation's recent turns as chat messages. Prompts with history are neither
+    cached nor coalesced (see reply_cache): the answer depends on that one customer's conversation.
+    """
+    if not settings.openai_api_key:
         return ""
+    key = reply_cache.key(user_id, context, user_message, history)
+    if key is None:
+        _counters["uncached"] += 1
+        return await _complete(user_message, context, user_id, history)
+    cached = reply_cache.get(key)
+    if cached is not None:
+        return cached
+    pending = _inflight.get(key)
+    if pending is not None:
+        _counters["coalesced"] += 1
+        return await asyncio.shield(pending)
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    reply = ""
+    try:
+        reply = await _complete(user_message, context, user_id, history)
+        if reply:
+            reply_cache.put(key, reply)  # Errors are not cached
+    finally:
+        _inflight.pop(key, None)
+        future.set_result(reply)
+    return reply
+
+
+async def get_ai_reply_within(
+    budget: float,
+    user_message: str,
+    context: str = "",
+    user_id: str | None = None,
+    history: list[dict] | None = None,
+) -> tuple[str, asyncio.Task | None]:
+    """
+    Wait at most `budget` seconds for get_ai_reply. Returns (reply, None) if it answered in time,
+    else ("", task) with the request still running (bounded by OPENAI_TIMEOUT) for an optional follow-up.
+    """
+    task = asyncio.ensure_future(get_ai_reply(user_message, context, user_id, history))
+    try:
+        # A zero budget still lets cache hits (which never block) through
+        reply = await asyncio.wait_for(asyncio.shield(task), timeout=max(budget, 0.001))
+    except asyncio.TimeoutError:
+        _counters["budget_missed"] += 1
+        return "", task
+    _counters["budget_met"] += 1
+    return reply, None
@@ -0,0 +1,340 @@
+"""
+Outbound send pipeline.
+Replies are saved as outbound Message rows with delivery_status="queued" and handed to this
+queue after commit. Each phone_number_id has its own FIFO and token bucket (Meta throughput
+limits are per number); a number's worker starts each send as its own task once the bucket and the
+global concurrency cap allow it, so throughput is not bounded by one Graph round trip at a time,
+while replies to the same recipient still go out in order. 429/5xx/network errors are retried with
+jittered exponential backoff inside that recipient's chain (later replies to them wait, others do not),
+and permanent failures are dead-lettered as delivery_status="failed" with the Graph error.
+Jobs only live in memory, so on startup `recover()` claims outbound rows a dead process left
+"queued" (untouched for OUTBOUND_RECOVER_AFTER seconds) and sends them again, or fails them.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import NamedTuple
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.message import Conversation, Message
+from app.models.whatsapp import WhatsAppAccount
+from app.services.whatsapp_service import send_text, SendResult
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundJob(NamedTuple):
+    message_id: str | None  # Outbound Message row to update; None for sends tracked elsewhere
+    phone_number_id: str
+    access_token: str
+    to_wa_phone: str
+    text: str
+    attempts: int = 0
+
+
+class TokenBucket:
+    """`rate` tokens per second, up to `burst` saved up. `pause()` empties it for a while (after a 429)."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+
+def backoff_delay(attempts: int) -> float:
+    """Full-jitter exponential backoff for the given (1-based) attempt number."""
+    cap = min(settings.outbound_retry_base_seconds * (2 ** (attempts - 1)), settings.outbound_retry_max_seconds)
+    return random.uniform(cap / 2, cap)
+
+
+class OutboundQueue:
+    def __init__(self, max_concurrency: int, max_attempts: int):
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self._queues: dict[str, deque[OutboundJob]] = {}
+        self._buckets: dict[str, TokenBucket] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        self._backing_off = 0  # Sends waiting to retry
+        self._in_flight: set[asyncio.Task] = set()
+        self._tails: dict[tuple[str, str], asyncio.Task] = {}  # (phone_number_id, recipient) -> latest send
+        self._semaphore: asyncio.Semaphore | None = None
+        self._recovery: asyncio.Task | None = None
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.recovered = 0
+        self.abandoned = 0
+
+    def bucket(self, phone_number_id: str) -> TokenBucket:
+        b = self._buckets.get(phone_number_id)
+        if b is None:
+            b = self._buckets[phone_number_id] = TokenBucket(settings.outbound_rate_per_second, settings.outbound_burst)
+        return b
+
+    def enqueue(self, job: OutboundJob) -> None:
+        """Never blocks. Starts a worker for the number if it has none."""
+        self._queues.setdefault(job.phone_number_id, deque()).append(job)
+        worker = self._workers.get(job.phone_number_id)
+        if worker is None or worker.done():
+            self._workers[job.phone_number_id] = asyncio.get_running_loop().create_task(
+                self._drain(job.phone_number_id), name=f"outbound-{job.phone_number_id}"
+            )
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def send(self, job: OutboundJob) -> SendResult:
+        """One rate-limited attempt, bypassing the queue (callers handle the result)."""
+        await self.bucket(job.phone_number_id).acquire()
+        async with self.semaphore:
+            return await self._attempt(job)
+
+    async def _attempt(self, job: OutboundJob) -> SendResult:
+        result = await send_text(job.phone_number_id, job.access_token, job.to_wa_phone, job.text)
+        if result.status_code == 429 or (result.retryable and result.retry_after):
+            self.bucket(job.phone_number_id).pause(result.retry_after or backoff_delay(job.attempts + 1))
+        return result
+
+    async def _drain(self, phone_number_id: str) -> None:
+        """Start the number's jobs in FIFO order as the token bucket and concurrency cap allow."""
+        queue = self._queues[phone_number_id]
+        bucket = self.bucket(phone_number_id)
+        try:
+            while queue:
+                await bucket.acquire()
+                await self.semaphore.acquire()
+                if not queue:
+                    self.semaphore.release()
+                    break
+                job = queue.popleft()
+                key = (phone_number_id, job.to_wa_phone)
+                task = asyncio.get_running_loop().create_task(self._run(job, key, self._tails.get(key)))
+                self._tails[key] = task
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+        finally:
+            self._workers.pop(phone_number_id, None)
+
+    async def _run(self, job: OutboundJob, key: tuple[str, str], previous: asyncio.Task | None) -> None:
+        """
+        Starts holding one concurrency slot; waits (without it) for the previous reply to the same
+        recipient first. Retries stay in this task (the recipient's chain), so later replies to that
+        recipient wait for them; the slot is released during the backoff so other recipients keep going.
+        """
+        holding = True
+        try:
+            if previous is not None and not previous.done():
+                # Waiting must not hold a slot: the previous send may need one again to retry
+                self.semaphore.release()
+                holding = False
+                await asyncio.wait([previous])
+                await self.semaphore.acquire()
+                holding = True
+            while True:
+                delay = await self._process(job)
+                if delay is None:
+                    return
+                job = job._replace(attempts=job.attempts + 1)
+                self.semaphore.release()
+                holding = False
+                self._backing_off += 1
+                try:
+                    await asyncio.sleep(delay)
+                finally:
+                    self._backing_off -= 1
+                await self.bucket(job.phone_number_id).acquire()
+                await self.semaphore.acquire()
+                holding = True
+        except Exception:
+            logger.exception("Outbound send for message %s failed unexpectedly", job.message_id)
+        finally:
+            if holding:
+                self.semaphore.release()
+            if self._tails.get(key) is asyncio.current_task():
+                del self._tails[key]
+
+    async def _process(self, job: OutboundJob) -> float | None:
+        """One attempt (job.attempts already made before it). Returns the backoff delay if it should be retried."""
+        attempt = job._replace(attempts=job.attempts + 1)
+        result = await self._attempt(attempt)
+        if result.ok:
+            self.sent += 1
+            await self._record(job.message_id, wa_message_id=result.wamid or None, delivery_status="sent")
+            return None
+        if result.retryable and attempt.attempts < self.max_attempts:
+            self.retried += 1
+            # Still owned by this process: keep the row out of other processes' recovery sweep
+            await self._record(job.message_id)
+            return result.retry_after or backoff_delay(attempt.attempts)
+        self.failed += 1
+        logger.warning("Outbound message %s dead-lettered: %s", job.message_id, result.error)
+        await self._record(job.message_id, delivery_status="failed", delivery_error=result.error)
+        return None
+
+    @staticmethod
+    async def _record(message_id: str | None, **values) -> None:
+        if not message_id:
+            return
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(Message)
+                .where(Message.id == message_id)
+                .values(status_updated_at=datetime.utcnow(), **values)
+            )
+            await session.commit()
+
+    async def start(self) -> None:
+        if self._recovery is None and settings.outbound_recover_after > 0:
+            self._recovery = asyncio.create_task(self._recover_all(), name="outbound-recovery")
+
+    async def _recover_all(self) -> None:
+        try:
+            while await self.recover():
+                pass
+        except Exception:
+            logger.exception("Recovering queued outbound messages failed")
+
+    async def recover(self, batch_size: int = 500) -> int:
+        """
+        Claim one batch of outbound rows left "queued" by a dead process and re-enqueue them.
+        Rows older than OUTBOUND_RECOVER_MAX_AGE are failed instead (the reply is no longer
+        useful, and free-form messages outside the 24h window are rejected anyway). Returns the
+        number of rows claimed.
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=settings.outbound_recover_after)
+        expired = now - timedelta(seconds=settings.outbound_recover_max_age)
+        queued = (Message.direction == "outbound") & (Message.delivery_status == "queued")
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                update(Message)
+                .where(queued, Message.status_updated_at < expired)
+                .values(delivery_status="failed", delivery_error="Not sent before restart", status_updated_at=now)
+            )
+            self.abandoned += result.rowcount or 0
+            # Bumping status_updated_at is the claim: other processes' sweeps skip the row from now on
+            claim = (
+                select(Message.id)
+                .where(queued, Message.status_updated_at < stale)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            result = await session.execute(
+                update(Message)
+                .where(Message.id.in_(claim.scalar_subquery()))
+                .values(status_updated_at=now)
+                .returning(Message.id)
+                .execution_options(synchronize_session=False)
+            )
+            ids = result.scalars().all()
+            if not ids:
+                await session.commit()
+                return 0
+            result = await session.execute(
+                select(Message.id, Message.body, Conversation.user_id, Conversation.wa_phone)
+                .join(Conversation, Conversation.id == Message.conversation_id)
+                .where(Message.id.in_(ids))
+            )
+            rows = result.all()
+            result = await session.execute(
+                select(WhatsAppAccount).where(
+                    WhatsAppAccount.user_id.in_({r.user_id for r in rows}),
+                    WhatsAppAccount.is_active == True,
+                )
+            )
+            accounts: dict[str, list[WhatsAppAccount]] = {}
+            for a in result.scalars().all():
+                accounts.setdefault(a.user_id, []).append(a)
+            jobs, orphaned = [], []
+            for r in rows:
+                candidates = accounts.get(r.user_id, [])
+                # The row does not record its sending number; only resend when it is unambiguous
+                if len(candidates) == 1:
+                    a = candidates[0]
+                    jobs.append(OutboundJob(r.id, a.phone_number_id, a.access_token, r.wa_phone, r.body))
+                else:
+                    orphaned.append(r.id)
+            if orphaned:
+                await session.execute(
+                    update(Message)
+                    .where(Message.id.in_(orphaned))
+                    .values(delivery_status="failed", delivery_error="Not sent before restart; sending number unknown")
+                    .execution_options(synchronize_session=False)
+                )
+            await session.commit()
+        self.abandoned += len(orphaned)
+        self.recovered += len(jobs)
+        for job in jobs:
+            self.enqueue(job)
+        if jobs or orphaned:
+            logger.info("Outbound recovery: %d re-enqueued, %d failed", len(jobs), len(orphaned))
+        return len(ids)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give queued sends a moment to finish; anything left stays "queued" and is recovered on restart."""
+        if self._recovery is not None:
+            self._recovery.cancel()
+            await asyncio.gather(self._recovery, return_exceptions=True)
+            self._recovery = None
+        # Workers stop starting new sends; sends already under way get `timeout` to finish
+        workers = list(self._workers.values())
+        for t in workers:
+            t.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        in_flight = list(self._in_flight)
+        if in_flight:
+            _, pending = await asyncio.wait(in_flight, timeout=timeout)
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._tails.clear()
+
+    def stats(self) -> dict:
+        return {
+            "queued": {pnid: len(q) for pnid, q in self._queues.items() if q},
+            "active_numbers": len(self._workers),
+            "in_flight": len(self._in_flight),
+            "retry_scheduled": self._backing_off,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "recovered": self.recovered,
+            "abandoned": self.abandoned,
+        }
+
+
+outbound_queue = OutboundQueue(
+    max_concurrency=settings.outbound_max_concurrency,
+    max_attempts=settings.outbound_max_attempts,
+)
@@ -0,0 +1,109 @@
+"""
+Cross-process invalidation over Postgres LISTEN/NOTIFY.
+Each process keeps one dedicated asyncpg connection that LISTENs on the subscribed channels.
+`notify()` runs inside the caller's transaction, so listeners only hear about committed changes.
+"""
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Channels
+ACCOUNT_ROUTING_CHANNEL = "account_routing"
+FLOW_CONFIG_CHANNEL = "flow_config"
+FAQ_CHANNEL = "faq"
+APP_EVENTS_CHANNEL = "app_events"  # Dashboard events, see event_bus
+
+
+async def notify(db: AsyncSession, channel: str, payload: str = "") -> None:
+    """Queue a notification; Postgres delivers it when `db` commits (and drops it on rollback)."""
+    await db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+
+
+def _asyncpg_dsn(url: str) -> str:
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+class PgListener:
+    """
+    Handlers are called with the notification payload. Reconnect handlers run after every
+    (re)connect: notifications sent while disconnected are lost, so caches should resync there.
+    """
+
+    def __init__(self, reconnect_delay: float = 5.0):
+        self.reconnect_delay = reconnect_delay
+        self._handlers: dict[str, list[Callable[[str], Any]]] = {}
+        self._reconnect_handlers: list[Callable[[], Any]] = []
+        self._task: asyncio.Task | None = None
+        self.connected = False
+        self.received = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.pg_listen_enabled
+
+    def subscribe(self, channel: str, handler: Callable[[str], Any]) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def on_reconnect(self, handler: Callable[[], Any]) -> None:
+        self._reconnect_handlers.append(handler)
+
+    async def start(self) -> None:
+        if self._task is None and settings.pg_listen_enabled:
+            self._task = asyncio.create_task(self._run(), name="pg-listener")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    @staticmethod
+    async def _call(handler: Callable, *args) -> None:
+        try:
+            result = handler(*args)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception("pg_notify handler %r failed", handler)
+
+    def _dispatch(self, conn, pid, channel: str, payload: str) -> None:
+        self.received += 1
+        for handler in self._handlers.get(channel, []):
+            asyncio.get_running_loop().create_task(self._call(handler, payload))
+
+    async def _run(self) -> None:
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(_asyncpg_dsn(settings.database_url))
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _c: lost.set())
+                for channel in self._handlers:
+                    await conn.add_listener(channel, self._dispatch)
+                self.connected = True
+                for handler in self._reconnect_handlers:
+                    await self._call(handler)
+                await lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("LISTEN connection failed; retrying in %ss", self.reconnect_delay)
+            finally:
+                self.connected = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def stats(self) -> dict:
+        return {"connected": self.connected, "channels": sorted(self._handlers), "received": self.received}
+
+
+pg_listener = PgListener()
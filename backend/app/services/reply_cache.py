@@ -0,0 +1,104 @@
+"""
+Per-tenant cache of AI replies, keyed on (user_id, stage context, normalized message text).
+Customers ask the same few things over and over ("price?", "location?"); a hit answers in
+microseconds without a model call. Bounded LRU with a TTL; a tenant's entries are dropped
+when its flow config changes (same NOTIFY channel as the compiled flow cache).
+Policy: only answers generated without conversation history are cached (and shared between a
+tenant's customers), and only for short messages (AI_CACHE_MAX_TEXT). A prompt that carries
+history bypasses the cache both ways, so one customer's context never reaches another.
+"""
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+from app.config import settings
+from app.services.pg_notify import pg_listener, FLOW_CONFIG_CHANNEL
+
+_SPACES = re.compile(r"\s+")
+_EDGE_PUNCT = " \t.,!?¿¡;:'\"()[]…-"
+
+
+def normalize(text: str) -> str:
+    """Case-, width- and whitespace-insensitive form, without surrounding punctuation: " Price?? " -> "price"."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _SPACES.sub(" ", text).strip(_EDGE_PUNCT)
+
+
+class ReplyCache:
+    def __init__(self, capacity: int, ttl: float, max_text: int):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.max_text = max_text  # Longer messages are too unlikely to repeat to be worth caching
+        self._entries: OrderedDict[tuple, tuple[str, float]] = OrderedDict()  # key -> (reply, expiry)
+        self._versions: dict[str, int] = {}  # Latest flow version invalidated per tenant
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, user_id: str | None, context: str, text: str, history: list[dict] | None = None) -> tuple | None:
+        """Cache key, or None if the reply must not be cached or served from cache (long text, or history sent)."""
+        if self.capacity <= 0 or history or len(text) > self.max_text:
+            return None
+        normalized = normalize(text)
+        return (user_id or "", context, normalized) if normalized else None
+
+    def get(self, key: tuple) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        reply, expiry = entry
+        if expiry < time.monotonic():
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return reply
+
+    def put(self, key: tuple, reply: str) -> None:
+        self._entries[key] = (reply, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, payload: str = "") -> None:
+        """NOTIFY payload is "user_id:version" (flow config saved); an empty payload clears everything."""
+        if not payload:
+            self._entries.clear()
+            return
+        user_id, _, version = payload.partition(":")
+        try:
+            v = int(version)
+            if self._versions.get(user_id, -1) >= v:
+                return  # Local invalidation already ran for this version
+            self._versions[user_id] = v
+        except ValueError:
+            pass
+        stale = [k for k in self._entries if k[0] == user_id]
+        for k in stale:
+            del self._entries[k]
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+reply_cache = ReplyCache(settings.ai_cache_size, settings.ai_cache_ttl, settings.ai_cache_max_text)
+pg_listener.subscribe(FLOW_CONFIG_CHANNEL, reply_cache.invalidate)
+pg_listener.on_reconnect(reply_cache.invalidate)
@@ -0,0 +1,209 @@
+"""
+Delivery/read status callbacks (value.statuses[]).
+Deliveries reach the durable inbox like any other webhook; inbox workers apply the statuses of a
+whole claimed batch as one UPDATE ... FROM (VALUES ...) in the transaction that deletes the rows,
+so status floods cost one statement per batch and an ack is never lost on restart.
+Callbacks that arrive before their outbound row is committed are coalesced in memory per wamid
+(only the furthest status is kept) and retried for a few flushes.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import NamedTuple
+from sqlalchemy import update, values, column, case, func, String, Integer, DateTime, Text
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.message import Message
+
+logger = logging.getLogger(__name__)
+
+# A status only ever moves forward; failed is terminal
+STATUS_RANK = {"sent": 1, "delivered": 2, "read": 3, "failed": 4}
+
+
+class StatusUpdate(NamedTuple):
+    wamid: str
+    status: str
+    at: datetime
+    error: str | None
+
+
+def extract_statuses(payload: dict) -> tuple[list[StatusUpdate], bool]:
+    """Return (status updates, whether the delivery also carries inbound messages)."""
+    updates = []
+    has_messages = False
+    try:
+        for entry in payload.get("entry", []) or []:
+            for change in entry.get("changes", []) or []:
+                value = change.get("value", {}) or {}
+                if value.get("messages"):
+                    has_messages = True
+                for st in value.get("statuses", []) or []:
+                    status = st.get("status")
+                    if not st.get("id") or status not in STATUS_RANK:
+                        continue
+                    try:
+                        at = datetime.utcfromtimestamp(int(st.get("timestamp")))
+                    except (TypeError, ValueError):
+                        at = datetime.utcnow()
+                    errors = st.get("errors") or []
+                    error = None
+                    if errors:
+                        e = errors[0] or {}
+                        error = f"{e.get('code', '')} {e.get('title') or e.get('message') or ''}".strip()[:2000]
+                    updates.append(StatusUpdate(str(st["id"])[:128], status, at, error))
+    except (AttributeError, TypeError):
+        pass
+    return updates, has_messages
+
+
+class StatusCoalescer:
+    def __init__(self, batch_size: int, flush_interval_ms: int, max_pending: int, max_retries: int):
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        # wamid -> (update, flushes without a matching row)
+        self._pending: dict[str, tuple[StatusUpdate, int]] = {}
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.received = 0
+        self.coalesced = 0
+        self.applied = 0
+        self.unmatched = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    def submit(self, updates: list[StatusUpdate], tries: int = 0) -> None:
+        """Merge callbacks into the pending set. Never blocks."""
+        for u in updates:
+            self.received += 1
+            current = self._pending.get(u.wamid)
+            if current:
+                self.coalesced += 1
+                if STATUS_RANK[u.status] > STATUS_RANK[current[0].status]:
+                    self._pending[u.wamid] = (u, current[1])
+                continue
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                continue
+            self._pending[u.wamid] = (u, tries)
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+
+    async def apply(self, session, updates: list[StatusUpdate]) -> None:
+        """
+        Apply `updates` in `session`'s transaction (the caller commits). Callbacks for the same
+        wamid are merged first; ones without a matching row yet go to the pending set for retry.
+        """
+        merged: dict[str, StatusUpdate] = {}
+        for u in updates:
+            self.received += 1
+            current = merged.get(u.wamid)
+            if current:
+                self.coalesced += 1
+                if STATUS_RANK[u.status] <= STATUS_RANK[current.status]:
+                    continue
+            merged[u.wamid] = u
+        items = list(merged.values())
+        unmatched = []
+        for i in range(0, len(items), self.batch_size):
+            chunk = items[i:i + self.batch_size]
+            matched = await self._apply(session, chunk)
+            self.applied += len(matched)
+            unmatched.extend(u for u in chunk if u.wamid not in matched)
+        if unmatched:
+            self.received -= len(unmatched)  # Counted again by submit
+            self.submit(unmatched, tries=1)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="status-coalescer")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final status flush failed")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Status flush failed")
+
+    async def flush(self) -> None:
+        """Apply everything pending, one UPDATE per batch_size wamids."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        items = list(pending.values())
+        async with AsyncSessionLocal() as session:
+            for i in range(0, len(items), self.batch_size):
+                chunk = items[i:i + self.batch_size]
+                matched = await self._apply(session, [u for u, _ in chunk])
+                await session.commit()
+                self.applied += len(matched)
+                for u, tries in chunk:
+                    if u.wamid in matched:
+                        continue
+                    # The outbound row may not be committed yet (callback raced the insert): retry a few flushes
+                    if tries + 1 < self.max_retries and u.wamid not in self._pending:
+                        self._pending[u.wamid] = (u, tries + 1)
+                    else:
+                        self.unmatched += 1
+        self.flushes += 1
+
+    @staticmethod
+    async def _apply(session, updates: list[StatusUpdate]) -> set[str]:
+        v = values(
+            column("wamid", String),
+            column("status", String),
+            column("rank", Integer),
+            column("at", DateTime),
+            column("error", Text),
+            name="v",
+        ).data([(u.wamid, u.status, STATUS_RANK[u.status], u.at, u.error) for u in updates])
+        current_rank = case(STATUS_RANK, value=Message.delivery_status, else_=0)
+        result = await session.execute(
+            update(Message)
+            .where(Message.wa_message_id == v.c.wamid, current_rank < v.c.rank)
+            .values(
+                delivery_status=v.c.status,
+                status_updated_at=v.c.at,
+                delivery_error=func.coalesce(v.c.error, Message.delivery_error),
+            )
+            .returning(Message.wa_message_id)
+            .execution_options(synchronize_session=False)
+        )
+        return {r[0] for r in result.all()}
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "applied": self.applied,
+            "unmatched": self.unmatched,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+        }
+
+
+status_coalescer = StatusCoalescer(
+    batch_size=settings.status_batch_size,
+    flush_interval_ms=settings.status_flush_ms,
+    max_pending=settings.status_max_pending,
+    max_retries=settings.status_max_retries,
+)
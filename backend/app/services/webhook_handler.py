@@ -1,215 +1,385 @@
 """
 Handle incoming WhatsApp Cloud API webhook: verify + process messages.
-Conversation flow: NEW -> ASK_NAME -> ASK_REQUIREMENT -> ASK_CONTACT -> DONE.
+Default conversation flow: NEW -> ASK_NAME -> ASK_REQUIREMENT -> ASK_CONTACT -> DONE
+(tenants can define their own; see flow_engine).
 """
+import asyncio
+import functools
+import logging
 import uuid
+from datetime import datetime
+from typing import NamedTuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
 
-from app.models.whatsapp import WhatsAppAccount, WebhookLog
-from app.models.conversation import ConversationConfig, ConversationStage
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.whatsapp import WebhookLog
+from app.models.conversation import ConversationStage
 from app.models.message import Conversation, Message
 from app.models.lead import Lead, LeadStatus
-from app.services.whatsapp_service import send_whatsapp_text
-from app.services.openai_service import get_ai_reply
+from app.services.outbound_queue import outbound_queue, OutboundJob
+from app.services.openai_service import get_ai_reply_within
 from app.services.notification_service import notify_new_lead
+from app.services.dispatcher import contact_dispatcher
+from app.services.dedup import seen_wamids
+from app.services.account_router import account_router, AccountSnapshot
+from app.services.flow_config import flow_configs
+from app.services.flow_engine import CompiledFlow, DEFAULT_FLOW, AI_FALLBACK, AI_FIRST
+from app.services.conversation_context import conversation_context, USER, ASSISTANT
+from app.services.faq_index import faq_index
+from app.services.event_bus import event_bus, MESSAGE, STAGE, preview, iso
 
-# Default messages (used when user has not customized)
-DEFAULTS = {
-    "NEW": "Hi! Thanks for reaching out. What is your name?",
-    "ASK_NAME": "Thanks! What do you need help with?",
-    "ASK_REQUIREMENT": "Please share your contact (phone or email) so we can get back to you.",
-    "ASK_CONTACT": "Thank you! We have noted your details and will contact you soon.",
-    "DONE": "Is there anything else we can help with?",
-}
+logger = logging.getLogger(__name__)
+
+# Slots that map onto Lead columns
+LEAD_SLOTS = ("name", "requirement", "contact")
+
+
+class InboundEvent(NamedTuple):
+    """One normalized inbound message from a webhook delivery."""
+    phone_number_id: str
+    wa_phone: str
+    text: str | None  # None for non-text messages (media, location, ...)
+    wamid: str | None  # WhatsApp message id
+
+
+def phone_number_id_of(value: dict) -> str | None:
+    """Business phone number id of a change value (Cloud API sends it under metadata)."""
+    return (value.get("metadata", {}) or {}).get("phone_number_id") or value.get("phone_number_id")
+
+
+def _events_from_entry(entry: dict) -> list[InboundEvent]:
+    """All inbound messages of one webhook entry, in delivery order."""
+    events = []
+    for change in entry.get("changes", []) or []:
+        if change.get("field") != "messages":
+            continue
+        value = change.get("value", {}) or {}
+        phone_number_id = phone_number_id_of(value)
+        for msg in value.get("messages", []) or []:
+            from_wa = msg.get("from")
+            if not phone_number_id or not from_wa:
+                continue
+            text = (msg.get("text", {}) or {}).get("body", "") if msg.get("type") == "text" else None
+            events.append(InboundEvent(str(phone_number_id), str(from_wa), text, msg.get("id")))
+    return events
+
+
+def _extract_events_from_wa_payload(payload: dict) -> list[InboundEvent]:
+    """Flatten every entry / change / message of a (possibly batched) delivery into a list of events."""
+    events = []
+    try:
+        for entry in payload.get("entry", []) or []:
+            events.extend(_events_from_entry(entry))
+    except (AttributeError, TypeError):
+        pass  # Malformed payload: keep whatever was parsed before the bad entry
+    return events
 
 
 def _extract_text_from_wa_payload(entry: dict) -> tuple[str | None, str | None, str | None]:
-    """Extract (phone_number_id, from_wa_id, text) from webhook entry."""
+    """Extract (phone_number_id, from_wa_id, text) of the first message in a webhook entry."""
     try:
-        for change in entry.get("changes", []):
-            if change.get("field") != "messages":
-                continue
-            value = change.get("value", {})
-            messages = value.get("messages", [])
-            if not messages:
-                continue
-            msg = messages[0]
-            if msg.get("type") != "text":
-                return (
-                    value.get("phone_number_id"),
-                    msg.get("from"),
-                    None,
-                )
-            return (
-                value.get("phone_number_id"),
-                msg.get("from"),
-                (msg.get("text", {}) or {}).get("body", ""),
-            )
-    except Exception:
-        pass
-    return None, None, None
-
-
-def _get_stage_message(config: ConversationConfig | None, stage: str) -> str:
-    """Get message for stage from config or default."""
-    if not config:
-        return DEFAULTS.get(stage, DEFAULTS["NEW"])
-    m = {
-        "NEW": config.msg_new,
-        "ASK_NAME": config.msg_ask_name,
-        "ASK_REQUIREMENT": config.msg_ask_requirement,
-        "ASK_CONTACT": config.msg_ask_contact,
-        "DONE": config.msg_done,
-    }
-    return m.get(stage) or DEFAULTS.get(stage, DEFAULTS["NEW"])
-
-
-def _get_ai_fallback(config: ConversationConfig | None, stage: str) -> bool:
-    if not config:
-        return False
-    m = {
-        "NEW": config.ai_fallback_new,
-        "ASK_NAME": config.ai_fallback_ask_name,
-        "ASK_REQUIREMENT": config.ai_fallback_ask_requirement,
-        "ASK_CONTACT": config.ai_fallback_ask_contact,
-        "DONE": config.ai_fallback_done,
-    }
-    return m.get(stage, False)
-
-
-async def process_incoming_message(db: AsyncSession, payload: dict) -> None:
+        events = _events_from_entry(entry)
+    except (AttributeError, TypeError):
+        events = []
+    if not events:
+        return None, None, None
+    first = events[0]
+    return first.phone_number_id, first.wa_phone, first.text
+
+
+async def _resolve_accounts(
+    db: AsyncSession, events: list[InboundEvent]
+) -> tuple[dict[str, AccountSnapshot], dict[str, CompiledFlow], list[InboundEvent]]:
     """
-    Process one incoming message: find account, conversation, update stage, send reply, save lead if DONE.
+    Resolve users and their compiled flow configs from in-memory caches (queries only on cache misses).
+    Returns (accounts by phone_number_id, configs by user_id, events for known accounts).
     """
-    # Find which entry has the message
-    for entry in payload.get("entry", []):
-        phone_number_id, from_wa, text = _extract_text_from_wa_payload(entry)
-        if not phone_number_id or not from_wa:
-            continue
-        to_send = phone_number_id
-        wa_phone = str(from_wa)
-        if not text:
-            text = ""
-
-        # Resolve user from WhatsApp account
-        result = await db.execute(
-            select(WhatsAppAccount).where(
-                WhatsAppAccount.phone_number_id == to_send,
-                WhatsAppAccount.is_active == True,
-            )
-        )
-        account = result.scalar_one_or_none()
-        if not account:
-            continue
-        user_id = account.user_id
-
-        # Load or create conversation and config
-        result = await db.execute(
-            select(Conversation).where(
-                Conversation.user_id == user_id,
-                Conversation.wa_phone == wa_phone,
-            )
+    accounts = await account_router.resolve(db, {e.phone_number_id for e in events})
+    events = [e for e in events if e.phone_number_id in accounts]
+    if not events:
+        return accounts, {}, events
+    configs = await flow_configs.get_many(db, {accounts[e.phone_number_id].user_id for e in events})
+    return accounts, configs, events
+
+
+async def _process_events(
+    db: AsyncSession,
+    accounts: dict[str, AccountSnapshot],
+    configs: dict[str, CompiledFlow],
+    events: list[InboundEvent],
+) -> None:
+    """
+    Get or create every conversation touched by `events`, save the inbound messages,
+    then run the stage flow per message in delivery order.
+    The upsert locks the conversation rows until commit, which serializes the same contact
+    across worker processes.
+    """
+    now = datetime.utcnow()
+    # Sorted so concurrent transactions lock rows in the same order
+    contacts = sorted({(accounts[e.phone_number_id].user_id, e.wa_phone) for e in events})
+    stmt = pg_insert(Conversation).values([
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "wa_phone": wa_phone,
+            "current_stage": (configs.get(user_id) or DEFAULT_FLOW).start,
+            "is_complete": False,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for user_id, wa_phone in contacts
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Conversation.user_id, Conversation.wa_phone],
+        set_={"updated_at": stmt.excluded.updated_at},
+    ).returning(Conversation)
+    result = await db.scalars(stmt, execution_options={"populate_existing": True})
+    conversations = {(c.user_id, c.wa_phone): c for c in result.all()}
+
+    # Save inbound messages in one INSERT; the unique wamid index turns redeliveries into no-ops
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversations[(accounts[e.phone_number_id].user_id, e.wa_phone)].id,
+            "direction": "inbound",
+            "body": e.text or "",
+            "wa_message_id": e.wamid,
+            "created_at": datetime.utcnow(),
+        }
+        for e in events
+    ]
+    result = await db.execute(
+        pg_insert(Message)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[Message.wa_message_id])
+        .returning(Message.wa_message_id)
+    )
+    inserted = {r[0] for r in result.all()}
+    # Remember wamids once the transaction commits (see _remember_committed_wamids)
+    db.info.setdefault("pending_wamids", set()).update(e.wamid for e in events if e.wamid)
+    events = [e for e in events if e.wamid is None or e.wamid in inserted]
+    for e in events:
+        user_id = accounts[e.phone_number_id].user_id
+        event_bus.stage(db, user_id, {
+            "type": MESSAGE,
+            "conversation_id": conversations[(user_id, e.wa_phone)].id,
+            "wa_phone": e.wa_phone,
+            "direction": "inbound",
+            "body": preview(e.text),
+            "created_at": iso(now),
+        })
+
+    # Stage transitions run in delivery order so messages from one contact stay sequential
+    for e in events:
+        account = accounts[e.phone_number_id]
+        await _advance_conversation(
+            db,
+            account,
+            conversations[(account.user_id, e.wa_phone)],
+            configs.get(account.user_id),
+            e.text or "",
         )
-        conv = result.scalar_one_or_none()
-        if not conv:
-            conv = Conversation(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                wa_phone=wa_phone,
-                current_stage="NEW",
-                is_complete=False,
-            )
-            db.add(conv)
-            await db.flush()
-
-        result = await db.execute(select(ConversationConfig).where(ConversationConfig.user_id == user_id))
-        config = result.scalar_one_or_none()
-
-        # Save inbound message
-        msg_in = Message(
+    # Dashboards hear about everything above when this transaction commits
+    await event_bus.flush(db)
+
+
+def _drop_seen(events: list[InboundEvent]) -> list[InboundEvent]:
+    """Drop replays already processed by this process, and duplicates within the batch."""
+    fresh = []
+    batch_ids = set()
+    for e in events:
+        if e.wamid:
+            if e.wamid in batch_ids or e.wamid in seen_wamids:
+                continue
+            batch_ids.add(e.wamid)
+        fresh.append(e)
+    return fresh
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_committed_wamids(session: Session) -> None:
+    wamids = session.info.pop("pending_wamids", None)
+    if wamids:
+        seen_wamids.update(wamids)
+    for job in session.info.pop("pending_outbound", None) or ():
+        outbound_queue.enqueue(job)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_wamids(session: Session) -> None:
+    # Not processed after all: a retry must be allowed through the front filter
+    session.info.pop("pending_wamids", None)
+    session.info.pop("pending_outbound", None)
+
+
+async def dispatch_incoming_message(payload: dict) -> None:
+    """
+    Process a webhook delivery through the contact dispatcher: each (user_id, wa_phone) group
+    runs on its ordered lane in its own session and transaction, different contacts in parallel.
+    All groups run to completion; the first failure is re-raised afterwards so the caller can retry
+    (contacts that already committed are skipped on replay by wamid).
+    """
+    events = _drop_seen(_extract_events_from_wa_payload(payload))
+    if not events:
+        return
+    async with AsyncSessionLocal() as db:
+        accounts, configs, events = await _resolve_accounts(db, events)
+    groups: dict[tuple[str, str], list[InboundEvent]] = {}
+    for e in events:
+        groups.setdefault((accounts[e.phone_number_id].user_id, e.wa_phone), []).append(e)
+
+    async def run(group: list[InboundEvent]) -> None:
+        async with AsyncSessionLocal() as session:
+            await _process_events(session, accounts, configs, group)
+            await session.commit()
+
+    results = await asyncio.gather(
+        *(contact_dispatcher.submit(key, functools.partial(run, group)) for key, group in groups.items()),
+        return_exceptions=True,
+    )
+    for r in results:
+        if isinstance(r, BaseException):
+            raise r
+
+
+def _lead_fields(slots: dict) -> tuple[str, str, str]:
+    """(name, requirement, contact) for a Lead; custom slots are appended to the requirement."""
+    extra = [f"{k}: {v}" for k, v in slots.items() if k not in LEAD_SLOTS and v]
+    requirement = "\n".join(filter(None, [slots.get("requirement") or ""] + extra))
+    return slots.get("name") or "", requirement, slots.get("contact") or ""
+
+
+async def _advance_conversation(
+    db: AsyncSession,
+    account: AccountSnapshot,
+    conv: Conversation,
+    flow: CompiledFlow | None,
+    text: str,
+) -> None:
+    """Advance one conversation by one inbound message: one transition-table step, lead capture, reply."""
+    user_id = account.user_id
+    wa_phone = conv.wa_phone
+    stage = conv.current_stage
+    step = (flow or DEFAULT_FLOW).step(stage)
+
+    # Slot capture: values are stored on the conversation as each stage completes
+    if step.reset_slots or step.capture:
+        slots = {} if step.reset_slots else dict(conv.slots or {})
+        if step.capture:
+            slots[step.capture] = text
+        conv.slots = slots
+    conv.current_stage = step.next_stage
+    if step.next_stage != stage:
+        event_bus.stage(db, user_id, {
+            "type": STAGE,
+            "conversation_id": conv.id,
+            "wa_phone": wa_phone,
+            "from": stage,
+            "to": step.next_stage,
+        })
+
+    if step.create_lead:
+        # Save lead from the captured slots; no message history scan
+        conv.is_complete = True
+        name_val, req_val, contact_info = _lead_fields(conv.slots or {})
+        lead = Lead(
             id=str(uuid.uuid4()),
+            user_id=user_id,
             conversation_id=conv.id,
-            direction="inbound",
-            body=text,
+            wa_phone=wa_phone,
+            name=name_val[:255] or None,
+            requirement=req_val or None,
+            contact_info=contact_info[:255] or None,
+            status=LeadStatus.NEW,
         )
-        db.add(msg_in)
+        db.add(lead)
         await db.flush()
+        await notify_new_lead(db, user_id, lead.id, name_val, wa_phone)
+
+    reply_text = step.reply
+    wants_ai = step.ai_mode == AI_FIRST or (step.ai_mode == AI_FALLBACK and not reply_text.strip())
+    # Tenant FAQs answer first wherever the AI would be asked, and in stages that loop on themselves (e.g. DONE)
+    faq = await faq_index.match(db, user_id, text) if wants_ai or step.next_stage == stage else None
+    if faq is not None:
+        reply_text = faq.answer
+    elif wants_ai:
+        flow = flow or DEFAULT_FLOW
+        budget_ms = flow.ai_budget_ms if flow.ai_budget_ms is not None else settings.ai_reply_budget_ms
+        ai_text, late = await get_ai_reply_within(
+            budget_ms / 1000, text, step.ai_context, user_id, conversation_context.history(conv)
+        )
+        reply_text = ai_text or reply_text
+        if late is not None:
+            # Over budget: the static message goes out now, the AI answer (if wanted) when it arrives
+            # (an unwanted one still finishes so the reply cache gets it, if it was asked without history)
+            if flow.ai_followup:
+                _schedule_followup(late, account, conv.id, wa_phone)
+            else:
+                _keep(late)
+
+    # Late follow-ups are not added: they are sent from another transaction
+    conversation_context.append(conv, (USER, text), (ASSISTANT, reply_text))
+    if reply_text:
+        _queue_reply(db, account, conv.id, wa_phone, reply_text)
+
+
+def _queue_reply(db: AsyncSession, account: AccountSnapshot, conversation_id: str, wa_phone: str, text: str) -> None:
+    """Save an outbound message; it is handed to the outbound queue once `db` commits."""
+    out_msg = Message(
+        id=str(uuid.uuid4()),
+        conversation_id=conversation_id,
+        direction="outbound",
+        body=text,
+        delivery_status="queued",  # Outbound queue sets wa_message_id and "sent"/"failed"
+        status_updated_at=datetime.utcnow(),
+    )
+    db.add(out_msg)
+    # Sent only once the reply (and everything it depends on) is committed
+    db.info.setdefault("pending_outbound", []).append(
+        OutboundJob(out_msg.id, account.phone_number_id, account.access_token, wa_phone, text)
+    )
+    event_bus.stage(db, account.user_id, {
+        "type": MESSAGE,
+        "conversation_id": conversation_id,
+        "wa_phone": wa_phone,
+        "direction": "outbound",
+        "body": preview(text),
+        "created_at": iso(out_msg.status_updated_at),
+    })
+
+
+_background: set[asyncio.Task] = set()
+_followup_counters = {"sent": 0, "empty": 0, "failed": 0}
+
+
+def _keep(task: asyncio.Task) -> None:
+    """Hold a reference to a fire-and-forget task until it finishes."""
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+def _schedule_followup(ai_task: asyncio.Task, account: AccountSnapshot, conversation_id: str, wa_phone: str) -> None:
+    async def followup() -> None:
+        try:
+            text = await ai_task
+            if not text:
+                _followup_counters["empty"] += 1
+                return
+            async with AsyncSessionLocal() as session:
+                _queue_reply(session, account, conversation_id, wa_phone, text)
+                await event_bus.flush(session)
+                await session.commit()
+            _followup_counters["sent"] += 1
+        except Exception:
+            _followup_counters["failed"] += 1
+            logger.exception("AI follow-up for conversation %s failed", conversation_id)
+
+    _keep(asyncio.create_task(followup()))
+
 
-        stage = conv.current_stage
-        reply_text = ""
-
-        # Stage transitions and reply
-        if stage == "NEW":
-            # User sent something -> move to ASK_NAME and send ASK_NAME message
-            conv.current_stage = "ASK_NAME"
-            reply_text = _get_stage_message(config, "ASK_NAME")
-            if not reply_text.strip() and _get_ai_fallback(config, "NEW"):
-                reply_text = await get_ai_reply(text, "Business first reply.") or reply_text or DEFAULTS["ASK_NAME"]
-        elif stage == "ASK_NAME":
-            # We treat as name
-            conv.current_stage = "ASK_REQUIREMENT"
-            reply_text = _get_stage_message(config, "ASK_REQUIREMENT")
-            if not reply_text.strip() and _get_ai_fallback(config, "ASK_NAME"):
-                reply_text = await get_ai_reply(text, "Customer just gave name.") or reply_text or DEFAULTS["ASK_REQUIREMENT"]
-        elif stage == "ASK_REQUIREMENT":
-            conv.current_stage = "ASK_CONTACT"
-            reply_text = _get_stage_message(config, "ASK_CONTACT")
-            if not reply_text.strip() and _get_ai_fallback(config, "ASK_REQUIREMENT"):
-                reply_text = await get_ai_reply(text, "Customer stated requirement.") or reply_text or DEFAULTS["ASK_CONTACT"]
-        elif stage == "ASK_CONTACT":
-            # Save lead and move to DONE
-            conv.current_stage = "DONE"
-            conv.is_complete = True
-            # Get name/requirement from previous messages (simplified: we could store in conversation metadata)
-            # For now we only have current text as contact_info; name/requirement from history would need parsing
-            msgs_result = await db.execute(
-                select(Message).where(Message.conversation_id == conv.id).order_by(Message.created_at)
-            )
-            msgs = list(msgs_result.scalars().all())
-            name_val = ""
-            req_val = ""
-            # First inbound after NEW is name, second is requirement
-            inbound_texts = [m.body for m in msgs if m.direction == "inbound"]
-            if len(inbound_texts) >= 1:
-                name_val = inbound_texts[0]
-            if len(inbound_texts) >= 2:
-                req_val = inbound_texts[1]
-            contact_info = text
-
-            lead = Lead(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                conversation_id=conv.id,
-                wa_phone=wa_phone,
-                name=name_val or None,
-                requirement=req_val or None,
-                contact_info=contact_info or None,
-                status=LeadStatus.NEW,
-            )
-            db.add(lead)
-            await db.flush()
-            await notify_new_lead(db, user_id, lead.id, name_val, wa_phone)
-
-            reply_text = _get_stage_message(config, "DONE")
-            if not reply_text.strip() and _get_ai_fallback(config, "ASK_CONTACT"):
-                reply_text = await get_ai_reply(text, "Customer gave contact.") or reply_text or DEFAULTS["DONE"]
-        else:
-            # DONE or unknown: optional AI fallback
-            if _get_ai_fallback(config, "DONE"):
-                reply_text = await get_ai_reply(text, "Follow-up in completed conversation.")
-            if not reply_text:
-                reply_text = _get_stage_message(config, "DONE") or DEFAULTS["DONE"]
-
-        if reply_text:
-            ok = await send_whatsapp_text(account.phone_number_id, account.access_token, wa_phone, reply_text)
-            if ok:
-                out_msg = Message(
-                    id=str(uuid.uuid4()),
-                    conversation_id=conv.id,
-                    direction="outbound",
-                    body=reply_text,
-                )
-                db.add(out_msg)
-        return  # Process one message per entry
-    return None
+def followup_stats() -> dict:
+    return dict(_followup_counters, pending=len(_background))
@@ -1,18 +1,92 @@
 """
 Send messages via WhatsApp Cloud API.
+All requests share one long-lived HTTP/2 client (keep-alive + multiplexing), created on first
+use and closed from the app lifespan.
 """
 import httpx
-from typing import Optional
+from typing import NamedTuple, Optional
 
-# Cloud API base
-BASE_URL = "https://graph.facebook.com/v18.0"
+from app.config import settings
 
+_client: httpx.AsyncClient | None = None
+_counters = {"requests": 0, "errors": 0, "in_flight": 0}
 
-async def send_whatsapp_text(phone_number_id: str, access_token: str, to_wa_phone: str, text: str) -> bool:
+
+def get_graph_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=settings.graph_http2,
+            limits=httpx.Limits(
+                max_connections=settings.graph_max_connections,
+                max_keepalive_connections=settings.graph_max_keepalive_connections,
+                keepalive_expiry=settings.graph_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.graph_connect_timeout,
+                read=settings.graph_read_timeout,
+                write=settings.graph_write_timeout,
+                pool=settings.graph_pool_timeout,
+            ),
+        )
+    return _client
+
+
+async def close_graph_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def graph_pool_stats() -> dict:
+    """Request counters plus the connection pool state (httpcore internals, best effort)."""
+    stats = dict(_counters, http2=settings.graph_http2, open=_client is not None and not _client.is_closed)
+    try:
+        pool = _client._transport._pool  # httpcore.AsyncConnectionPool
+        conns = list(pool.connections)
+        stats.update(
+            connections=len(conns),
+            idle=sum(1 for c in conns if c.is_idle()),
+            http2_connections=sum(1 for c in conns if "HTTP/2" in repr(c)),
+            queued_requests=len(getattr(pool, "_requests", [])),
+        )
+    except AttributeError:
+        pass
+    return stats
+
+
+class SendResult(NamedTuple):
+    wamid: Optional[str]         # Set on success ("" if the API omitted it)
+    status_code: Optional[int]   # None for network errors
+    error: Optional[str]         # Graph error "code: message" or exception text
+    retryable: bool              # 429 / 5xx / throttling codes / network errors
+    retry_after: Optional[float] = None  # Seconds, from the Retry-After header
+
+    @property
+    def ok(self) -> bool:
+        return self.wamid is not None
+
+
+# Graph error codes that mean "slow down", even when returned with HTTP 400
+THROTTLING_CODES = {4, 80007, 130429, 131048, 131056}
+
+
+def _graph_error(r: httpx.Response) -> tuple[Optional[int], str]:
+    try:
+        err = r.json().get("error") or {}
+    except ValueError:
+        return None, f"HTTP {r.status_code}"
+    code = err.get("code")
+    return code, f"{code}: {err.get('message') or err.get('error_user_msg') or ''}".strip()
+
+
+async def send_text(phone_number_id: str, access_token: str, to_wa_phone: str, text: str) -> SendResult:
     """
     Send a text message. to_wa_phone should be digits only (e.g. 1234567890).
+    Returns a SendResult with the Graph message id, or the error and whether a retry makes sense.
     """
-    url = f"{BASE_URL}/{phone_number_id}/messages"
+    url = f"{settings.graph_base_url.rstrip('/')}/{phone_number_id}/messages"
     payload = {
         "messaging_product": "whatsapp",
         "recipient_type": "individual",
@@ -21,9 +95,33 @@ async def send_whatsapp_text(phone_number_id: str, access_token: str, to_wa_phon
         "text": {"body": text[:4096]},
     }
     headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+    _counters["requests"] += 1
+    _counters["in_flight"] += 1
     try:
-        async with httpx.AsyncClient() as client:
-            r = await client.post(url, json=payload, headers=headers, timeout=30.0)
-            return r.status_code == 200
-    except Exception:
-        return False
+        r = await get_graph_client().post(url, json=payload, headers=headers)
+        if r.status_code == 200:
+            messages = r.json().get("messages") or [{}]
+            # Older API versions may omit the id; still a successful send
+            return SendResult(messages[0].get("id") or "", 200, None, False)
+        _counters["errors"] += 1
+        code, error = _graph_error(r)
+        retry_after = None
+        try:
+            retry_after = float(r.headers.get("retry-after", ""))
+        except ValueError:
+            pass
+        retryable = r.status_code == 429 or r.status_code >= 500 or code in THROTTLING_CODES
+        return SendResult(None, r.status_code, error, retryable, retry_after)
+    except Exception as e:
+        _counters["errors"] += 1
+        return SendResult(None, None, f"{e.__class__.__name__}: {e}"[:500], True)
+    finally:
+        _counters["in_flight"] -= 1
+
+
+async def send_whatsapp_text(phone_number_id: str, access_token: str, to_wa_phone: str, text: str) -> Optional[str]:
+    """
+    Send a text message once, without queueing or retries.
+    Returns the Graph API message id (wamid) on success, None on failure.
+    """
+    return (await send_text(phone_number_id, access_token, to_wa_phone, text)).wamid
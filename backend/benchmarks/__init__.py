@@ -0,0 +1 @@
+"""Benchmarks: payload generator, end-to-end webhook load test and hot-path micro-benchmarks."""
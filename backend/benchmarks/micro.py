@@ -0,0 +1,68 @@
+"""
+Micro-benchmarks for the per-message hot path that needs no database:
+payload parsing, status extraction and stage resolution. Run from backend dir:
+  python -m benchmarks.micro [--compare] [--save-baseline]
+Results are microseconds per call (median of repeats).
+"""
+import argparse
+import json
+import timeit
+
+from benchmarks.payloads import PayloadFactory, large_payload
+from benchmarks.report import add_common_args, finish
+from app.services.webhook_handler import _extract_text_from_wa_payload, _extract_events_from_wa_payload
+from app.services.status_pipeline import extract_statuses
+from app.services.flow_engine import DEFAULT_FLOW, STAGES, compile_flow
+
+
+def bench(fn, number: int, repeat: int) -> float:
+    """Median microseconds per call."""
+    times = sorted(timeit.repeat(fn, number=number, repeat=repeat))
+    return round(times[len(times) // 2] / number * 1e6, 3)
+
+
+def custom_flow(stages: int = 30):
+    """A long linear custom flow, as a tenant with a big questionnaire would define."""
+    names = [f"Q{i}" for i in range(stages)]
+    return compile_flow({
+        "stages": [
+            {"name": n, "next": names[min(i + 1, stages - 1)], "reply": f"Question {i + 1}?", "capture": n.lower()}
+            for i, n in enumerate(names)
+        ],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20_000, help="Calls per repeat")
+    parser.add_argument("--repeat", type=int, default=7)
+    add_common_args(parser)
+    args = parser.parse_args()
+    n, r = args.number, args.repeat
+
+    factory = PayloadFactory(["bench-pnid-0"], contacts=100)
+    single = json.loads(factory.text().body)
+    single_entry = single["entry"][0]
+    batch = json.loads(factory.batch(entries=3, per_entry=4).body)
+    big = large_payload(50)
+    statuses = json.loads(factory.status(count=20).body)
+    flow = custom_flow()
+    stage_cycle = list(STAGES) + ["UNKNOWN_STAGE"]
+    flow_cycle = list(flow.names)
+
+    metrics = {
+        "extract_text_single_us": bench(lambda: _extract_text_from_wa_payload(single_entry), n, r),
+        "extract_events_single_us": bench(lambda: _extract_events_from_wa_payload(single), n, r),
+        "extract_events_batch12_us": bench(lambda: _extract_events_from_wa_payload(batch), n // 4, r),
+        "extract_events_50_us": bench(lambda: _extract_events_from_wa_payload(big), n // 10, r),
+        "extract_statuses_20_us": bench(lambda: extract_statuses(statuses), n // 4, r),
+        # Stage resolution: one lookup per stage of the default flow (incl. an unknown stage -> fallback)
+        "default_flow_step_cycle_us": bench(lambda: [DEFAULT_FLOW.step(s) for s in stage_cycle], n, r),
+        "custom_flow_30_step_cycle_us": bench(lambda: [flow.step(s) for s in flow_cycle], n // 5, r),
+        "compile_custom_flow_30_us": bench(custom_flow, n // 100, r),
+    }
+    finish("micro", metrics, args)
+
+
+if __name__ == "__main__":
+    main()
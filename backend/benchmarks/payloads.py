@@ -0,0 +1,133 @@
+"""
+Realistic WhatsApp Cloud API webhook payloads for benchmarks.
+Covers what Meta actually sends: single messages, batched multi-entry/multi-message deliveries,
+media, status callbacks and redeliveries (same wamid posted again).
+"""
+import json
+import random
+import time
+import uuid
+from typing import NamedTuple
+
+TEXTS = (
+    "Hi", "Hello, I saw your ad", "John Smith", "Maria", "I need a quote for 20 units",
+    "Do you deliver to Lagos?", "What are your opening hours?", "john@example.com",
+    "+1 555 0100", "Thanks!", "Can someone call me back tomorrow morning please?",
+)
+MEDIA_TYPES = ("image", "audio", "document", "video", "sticker")
+
+
+class Delivery(NamedTuple):
+    kind: str           # text | batch | media | status | replay
+    body: bytes         # Raw POST body
+    contacts: tuple     # wa_phone of every new inbound message (one expected reply each)
+
+
+class PayloadFactory:
+    """Deterministic (seeded) payload generator over a fixed set of numbers and contacts."""
+
+    def __init__(self, phone_number_ids: list[str], contacts: int = 1000, seed: int = 1):
+        self.rng = random.Random(seed)
+        self.phone_number_ids = phone_number_ids
+        self.contacts = [f"1555{n:07d}" for n in range(contacts)]
+        self._sent_wamids: list[tuple[str, str, dict]] = []  # Recent (pnid, wa_phone, message) for replays
+        self._outbound_wamids: list[tuple[str, str]] = []
+
+    def _message(self, wa_phone: str, media: bool = False) -> dict:
+        msg = {
+            "from": wa_phone,
+            "id": f"wamid.BENCH{uuid.UUID(int=self.rng.getrandbits(128)).hex}",
+            "timestamp": str(int(time.time())),
+        }
+        if media:
+            kind = self.rng.choice(MEDIA_TYPES)
+            msg.update(type=kind, **{kind: {"id": str(self.rng.getrandbits(48)), "mime_type": "application/octet-stream"}})
+        else:
+            msg.update(type="text", text={"body": self.rng.choice(TEXTS)})
+        return msg
+
+    @staticmethod
+    def _value(phone_number_id: str, **fields) -> dict:
+        return {
+            "messaging_product": "whatsapp",
+            "metadata": {"display_phone_number": "15550000000", "phone_number_id": phone_number_id},
+            **fields,
+        }
+
+    @staticmethod
+    def _envelope(entries: list[dict]) -> bytes:
+        return json.dumps({"object": "whatsapp_business_account", "entry": entries}).encode()
+
+    def _entry(self, phone_number_id: str, messages: list[dict]) -> dict:
+        contacts = [{"profile": {"name": "Bench"}, "wa_id": m["from"]} for m in messages]
+        return {
+            "id": "bench-waba",
+            "changes": [{"field": "messages", "value": self._value(phone_number_id, contacts=contacts, messages=messages)}],
+        }
+
+    def _remember(self, phone_number_id: str, messages: list[dict]) -> None:
+        for m in messages:
+            self._sent_wamids.append((phone_number_id, m["from"], m))
+        del self._sent_wamids[:-1000]
+
+    def text(self, media: bool = False) -> Delivery:
+        pnid, wa_phone = self.rng.choice(self.phone_number_ids), self.rng.choice(self.contacts)
+        msg = self._message(wa_phone, media=media)
+        self._remember(pnid, [msg])
+        return Delivery("media" if media else "text", self._envelope([self._entry(pnid, [msg])]), (wa_phone,))
+
+    def batch(self, entries: int = 3, per_entry: int = 4) -> Delivery:
+        """Several entries (numbers) with several messages each, as Meta batches under load."""
+        out, contacts = [], []
+        for _ in range(entries):
+            pnid = self.rng.choice(self.phone_number_ids)
+            messages = [self._message(self.rng.choice(self.contacts)) for _ in range(per_entry)]
+            self._remember(pnid, messages)
+            contacts.extend(m["from"] for m in messages)
+            out.append(self._entry(pnid, messages))
+        return Delivery("batch", self._envelope(out), tuple(contacts))
+
+    def status(self, count: int = 5) -> Delivery:
+        """sent/delivered/read callbacks for previously sent (or unknown) wamids; no replies expected."""
+        pnid = self.rng.choice(self.phone_number_ids)
+        statuses = []
+        for _ in range(count):
+            wamid, wa_phone = (
+                self.rng.choice(self._outbound_wamids) if self._outbound_wamids
+                else (f"wamid.OUT{self.rng.getrandbits(64):x}", self.rng.choice(self.contacts))
+            )
+            statuses.append({
+                "id": wamid,
+                "status": self.rng.choice(("sent", "delivered", "read")),
+                "timestamp": str(int(time.time())),
+                "recipient_id": wa_phone,
+            })
+        entry = {"id": "bench-waba", "changes": [{"field": "messages", "value": self._value(pnid, statuses=statuses)}]}
+        return Delivery("status", self._envelope([entry]), ())
+
+    def replay(self) -> Delivery:
+        """Redelivery of an earlier message (Meta retries on slow acks); must not produce a second reply."""
+        if not self._sent_wamids:
+            return self.text()
+        pnid, _, msg = self.rng.choice(self._sent_wamids)
+        return Delivery("replay", self._envelope([self._entry(pnid, [msg])]), ())
+
+    def record_outbound(self, wamid: str, wa_phone: str) -> None:
+        """Feed back wamids of sent replies so status callbacks match real rows."""
+        self._outbound_wamids.append((wamid, wa_phone))
+        del self._outbound_wamids[:-5000]
+
+    def mixed(self, mix: dict[str, float]):
+        """Endless stream of deliveries, picking kinds by weight, e.g. {"text": 0.6, "status": 0.3, "replay": 0.1}."""
+        kinds, weights = zip(*mix.items())
+        makers = {"text": self.text, "batch": self.batch, "media": lambda: self.text(media=True),
+                  "status": self.status, "replay": self.replay}
+        while True:
+            yield makers[self.rng.choices(kinds, weights)[0]]()
+
+
+def large_payload(messages: int = 50, phone_number_id: str = "bench-pnid-0") -> dict:
+    """One delivery with many messages, for parser micro-benchmarks."""
+    factory = PayloadFactory([phone_number_id], contacts=messages)
+    msgs = [factory._message(wa_phone) for wa_phone in factory.contacts]
+    return json.loads(factory._envelope([factory._entry(phone_number_id, msgs)]))
@@ -0,0 +1,100 @@
+"""
+Shared helpers: percentiles, printing, and comparison against the stored baseline.
+Metrics ending in "_per_s" are better when higher; everything else (latencies, queries) when lower.
+"""
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def percentiles(samples: list[float], points=(50, 95, 99)) -> dict[str, float | None]:
+    """Nearest-rank percentiles, in the samples' unit."""
+    s = sorted(samples)
+    return {f"p{p}": (s[min(len(s) - 1, max(0, round(p / 100 * len(s)) - 1))] if s else None) for p in points}
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+    }
+
+
+def print_metrics(title: str, metrics: dict) -> None:
+    print(f"\n{title}")
+    width = max(map(len, metrics), default=0)
+    for name, value in metrics.items():
+        shown = "-" if value is None else (f"{value:,.3f}" if isinstance(value, float) else f"{value:,}")
+        print(f"  {name:<{width}}  {shown}")
+
+
+def higher_is_better(name: str) -> bool:
+    return name.endswith("_per_s")
+
+
+def compare(section: str, metrics: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a line per metric that regressed by more than `tolerance` (e.g. 0.15 = 15%)."""
+    regressions = []
+    if not baseline.get(section):
+        print(f"  No {section} baseline recorded; run with --save-baseline on the reference machine first")
+        return regressions
+    for name, base in baseline[section].items():
+        value = metrics.get(name)
+        if base in (None, 0) or value is None:
+            continue
+        change = (value - base) / base
+        worse = -change if higher_is_better(name) else change
+        marker = "REGRESSION" if worse > tolerance else "ok"
+        print(f"  {section}.{name}: {base:,.3f} -> {value:,.3f} ({change:+.1%}) {marker}")
+        if worse > tolerance:
+            regressions.append(f"{section}.{name} {change:+.1%}")
+    return regressions
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(section: str, metrics: dict, path: str = BASELINE_PATH) -> None:
+    """Replace one section of the baseline file, keeping the others."""
+    try:
+        data = load_baseline(path)
+    except FileNotFoundError:
+        data = {}
+    data[section] = metrics
+    data.setdefault("_environment", {})[section] = dict(environment(), args=" ".join(sys.argv[1:]))
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\nSaved {section} baseline to {path}")
+
+
+def finish(section: str, metrics: dict, args) -> None:
+    """Common tail of every benchmark: print, optionally write JSON/baseline, compare and set the exit code."""
+    print_metrics(section, metrics)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({section: metrics, "_environment": environment()}, f, indent=2)
+    if args.save_baseline:
+        save_baseline(section, metrics)
+        return
+    if args.compare:
+        print(f"\nAgainst baseline (tolerance {args.tolerance:.0%}):")
+        regressions = compare(section, metrics, load_baseline(), args.tolerance)
+        if regressions:
+            print("Regressed: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+def add_common_args(parser) -> None:
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", action="store_true", help="Compare with benchmarks/baseline.json; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression before failing (default 0.25)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
@@ -0,0 +1,206 @@
+"""
+End-to-end webhook benchmark: POST /webhook -> inbox -> workers -> conversation flow -> outbound reply.
+Run from backend dir against a migrated local database and the stand-in upstreams:
+  python scripts/mock_upstreams.py --port 9000 &
+  GRAPH_BASE_URL=http://localhost:9000/graph/v18.0 DATABASE_URL=postgresql+asyncpg://localhost/whatsapp_bench \\
+      python -m benchmarks.webhook_bench --rate 200 --duration 30
+
+Deliveries are sent open-loop at the target rate through the real ASGI app (lifespan included), so
+latencies are measured from each delivery's scheduled time and include any queueing behind slow acks.
+Reports ack latency, webhook-to-reply latency (until the Graph send returned), messages per second
+and SQL statements per inbound message.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import defaultdict, deque
+
+import httpx
+from sqlalchemy import delete, event, select
+
+from benchmarks.payloads import PayloadFactory
+from benchmarks.report import add_common_args, finish, percentiles
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.main import app
+from app.core.security import get_password_hash
+from app.models.user import User, UserRole
+from app.models.whatsapp import WhatsAppAccount
+from app.models.message import Conversation, Message
+from app.models.lead import Lead
+from app.models.notification import Notification
+from app.services import outbound_queue as outbound_module
+from app.services.account_router import account_router
+
+BENCH_EMAIL = "bench@localhost"
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """Parse "text=0.6,status=0.3,replay=0.1" into {"text": 0.6, ...}."""
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+async def seed(numbers: int, keep_data: bool) -> list[str]:
+    """Create the benchmark user and numbers; clear its conversations from earlier runs."""
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(select(User).where(User.email == BENCH_EMAIL))).scalar_one_or_none()
+        if user is None:
+            user = User(
+                id=str(uuid.uuid4()),
+                email=BENCH_EMAIL,
+                hashed_password=get_password_hash(uuid.uuid4().hex),
+                role=UserRole.USER,
+                is_active=True,
+            )
+            db.add(user)
+            await db.flush()
+        pnids = [f"bench-pnid-{i}" for i in range(numbers)]
+        existing = set((await db.execute(
+            select(WhatsAppAccount.phone_number_id).where(WhatsAppAccount.phone_number_id.in_(pnids))
+        )).scalars().all())
+        for pnid in pnids:
+            if pnid not in existing:
+                db.add(WhatsAppAccount(
+                    id=str(uuid.uuid4()),
+                    user_id=user.id,
+                    phone_number_id=pnid,
+                    phone_number="+15550000000",
+                    access_token="bench-token",
+                    is_active=True,
+                ))
+        if not keep_data:
+            conv_ids = select(Conversation.id).where(Conversation.user_id == user.id)
+            await db.execute(delete(Message).where(Message.conversation_id.in_(conv_ids)))
+            await db.execute(delete(Notification).where(Notification.user_id == user.id))
+            await db.execute(delete(Lead).where(Lead.user_id == user.id))
+            await db.execute(delete(Conversation).where(Conversation.user_id == user.id))
+        await db.commit()
+    return pnids
+
+
+class Probe:
+    """Counts SQL statements and pairs each inbound message with the reply sent to that contact."""
+
+    def __init__(self, factory: PayloadFactory):
+        self.factory = factory
+        self.queries = 0
+        self.awaiting: dict[str, deque[float]] = defaultdict(deque)  # wa_phone -> scheduled times, FIFO
+        self.expected = 0
+        self.e2e: list[float] = []
+        self.send_failures = 0
+
+    def on_query(self, *_):
+        self.queries += 1
+
+    def expect(self, contacts: tuple, at: float) -> None:
+        for wa_phone in contacts:
+            self.awaiting[wa_phone].append(at)
+        self.expected += len(contacts)
+
+    def wrap(self, send_text):
+        async def timed_send_text(phone_number_id, access_token, to_wa_phone, text):
+            result = await send_text(phone_number_id, access_token, to_wa_phone, text)
+            if not result.ok:
+                self.send_failures += 1
+                if result.retryable:
+                    return result  # The queue retries; measure when it finally goes out
+            queue = self.awaiting.get(to_wa_phone)
+            if queue:
+                self.e2e.append(time.perf_counter() - queue.popleft())
+            if result.ok:
+                self.factory.record_outbound(result.wamid, to_wa_phone)
+            return result
+        return timed_send_text
+
+
+async def run(args) -> dict:
+    pnids = await seed(args.numbers, args.keep_data)
+    factory = PayloadFactory(pnids, contacts=args.contacts, seed=args.seed)
+    probe = Probe(factory)
+    outbound_module.send_text = probe.wrap(outbound_module.send_text)
+    event.listen(engine.sync_engine, "before_cursor_execute", probe.on_query)
+
+    stream = factory.mixed(parse_mix(args.mix))
+    total = int(args.rate * args.duration)
+    acks: list[float] = []
+    errors = 0
+    kinds: dict[str, int] = defaultdict(int)
+    inbound_messages = 0
+
+    async with app.router.lifespan_context(app):
+        # Seeded accounts may postdate the routing table loaded at startup
+        account_router.invalidate()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+            queries_before = probe.queries
+            start = time.perf_counter()
+
+            async def post(delivery, scheduled: float):
+                nonlocal errors
+                r = await client.post("/webhook", content=delivery.body, headers={"content-type": "application/json"})
+                acks.append(time.perf_counter() - scheduled)
+                if r.status_code != 200:
+                    errors += 1
+
+            tasks = []
+            for i in range(total):
+                scheduled = start + i / args.rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                delivery = next(stream)
+                kinds[delivery.kind] += 1
+                inbound_messages += len(delivery.contacts)
+                probe.expect(delivery.contacts, scheduled)
+                tasks.append(asyncio.create_task(post(delivery, scheduled)))
+            await asyncio.gather(*tasks)
+            sent_at = time.perf_counter()
+            while len(probe.e2e) < probe.expected and time.perf_counter() - sent_at < args.drain_timeout:
+                await asyncio.sleep(0.05)
+            elapsed = time.perf_counter() - start
+            queries = probe.queries - queries_before
+
+    ack = percentiles([a * 1000 for a in acks])
+    e2e = percentiles([e * 1000 for e in probe.e2e])
+    print(f"deliveries: {dict(kinds)}  inbound messages: {inbound_messages}  replies: {len(probe.e2e)}/{probe.expected}")
+    return {
+        "deliveries_per_s": round(total / (sent_at - start), 1),
+        "messages_per_s": round(len(probe.e2e) / elapsed, 1),
+        "ack_p50_ms": ack["p50"],
+        "ack_p95_ms": ack["p95"],
+        "ack_p99_ms": ack["p99"],
+        "e2e_p50_ms": e2e["p50"],
+        "e2e_p95_ms": e2e["p95"],
+        "e2e_p99_ms": e2e["p99"],
+        "queries_per_message": round(queries / inbound_messages, 2) if inbound_messages else None,
+        "missing_replies": probe.expected - len(probe.e2e),
+        "http_errors": errors,
+        "send_failures": probe.send_failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end webhook benchmark")
+    parser.add_argument("--rate", type=float, default=100.0, help="Deliveries per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load")
+    parser.add_argument("--numbers", type=int, default=5, help="Business phone numbers (tenants share one user)")
+    parser.add_argument("--contacts", type=int, default=2000, help="Distinct customer phones")
+    parser.add_argument("--mix", default="text=0.55,batch=0.1,media=0.05,status=0.25,replay=0.05")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="Max seconds to wait for replies after the load")
+    parser.add_argument("--keep-data", action="store_true", help="Do not delete conversations from earlier runs")
+    add_common_args(parser)
+    args = parser.parse_args()
+    if "graph.facebook.com" in settings.graph_base_url:
+        parser.error("GRAPH_BASE_URL points at the real Graph API; start scripts/mock_upstreams.py and point it there")
+    metrics = asyncio.run(run(args))
+    finish("webhook", metrics, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Local stand-in for the WhatsApp Graph API and OpenAI, for load tests and CI. Run from backend dir:
+  python scripts/mock_upstreams.py --port 9000 --graph-latency lognormal:40:300 --graph-429-rate 0.02
+
+Then point the app at it:
+  GRAPH_BASE_URL=http://localhost:9000/graph/v18.0
+  OPENAI_BASE_URL=http://localhost:9000/openai/v1  OPENAI_API_KEY=mock
+
+Endpoints:
+  POST /graph/{version}/{phone_number_id}/messages   Cloud API send (returns a wamid)
+  POST /openai/v1/chat/completions                   Chat completion (echoes the user message)
+  GET  /_stats                                       Request counts, outcomes and latency percentiles
+  POST /_config                                      Change behaviour at runtime, e.g. {"graph": {"error_rate": 0.1}}
+  POST /_reset                                       Clear stats
+
+Latency specs (milliseconds): fixed:MS, uniform:MIN:MAX, lognormal:MEDIAN:P99.
+With --webhook-url, every accepted send is followed by "sent" and "delivered" status callbacks
+posted to the app's /webhook, like Meta does.
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+import uuid
+from collections import deque
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+Z_99 = 2.3263  # Standard normal quantile for p99
+
+
+def parse_latency(spec: str):
+    """Return a zero-argument function producing a delay in seconds."""
+    kind, *args = spec.split(":")
+    nums = [float(a) / 1000 for a in args]
+    if kind == "fixed" and len(nums) == 1:
+        return lambda: nums[0]
+    if kind == "uniform" and len(nums) == 2:
+        return lambda: random.uniform(nums[0], nums[1])
+    if kind == "lognormal" and len(nums) == 2:
+        median, p99 = nums
+        mu, sigma = math.log(median), max(math.log(p99 / median), 1e-9) / Z_99
+        return lambda: random.lognormvariate(mu, sigma)
+    raise ValueError(f"Bad latency spec {spec!r} (fixed:MS, uniform:MIN:MAX, lognormal:MEDIAN:P99)")
+
+
+class Upstream:
+    """Behaviour and counters of one mocked upstream."""
+
+    def __init__(self, latency: str, error_rate: float, rate_limit_rate: float, retry_after: float):
+        self.configure(latency=latency, error_rate=error_rate, rate_limit_rate=rate_limit_rate, retry_after=retry_after)
+        self.reset()
+
+    def configure(self, **kw) -> None:
+        if "latency" in kw:
+            self.latency_spec = kw["latency"]
+            self.delay = parse_latency(kw["latency"])
+        for key in ("error_rate", "rate_limit_rate", "retry_after"):
+            if key in kw:
+                setattr(self, key, float(kw[key]))
+
+    def reset(self) -> None:
+        self.counts = {"ok": 0, "error": 0, "rate_limited": 0, "unauthorized": 0}
+        self.latencies: deque[float] = deque(maxlen=100_000)  # Most recent requests only
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def respond(self) -> str:
+        """Sleep for the configured latency and pick an outcome: ok | error | rate_limited."""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        start = time.perf_counter()
+        try:
+            await asyncio.sleep(self.delay())
+        finally:
+            self.in_flight -= 1
+            self.latencies.append(time.perf_counter() - start)
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            outcome = "rate_limited"
+        elif roll < self.rate_limit_rate + self.error_rate:
+            outcome = "error"
+        else:
+            outcome = "ok"
+        self.counts[outcome] += 1
+        return outcome
+
+    def stats(self) -> dict:
+        lat = sorted(self.latencies)
+
+        def pct(p: float) -> float | None:
+            return round(lat[min(int(p * len(lat)), len(lat) - 1)] * 1000, 1) if lat else None
+
+        return {
+            "latency": self.latency_spec,
+            "error_rate": self.error_rate,
+            "rate_limit_rate": self.rate_limit_rate,
+            "requests": sum(self.counts.values()),
+            **self.counts,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)},
+        }
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    app = FastAPI(title="Mock upstreams")
+    graph = Upstream(args.graph_latency, args.graph_error_rate, args.graph_429_rate, args.retry_after)
+    openai = Upstream(args.openai_latency, args.openai_error_rate, args.openai_429_rate, args.retry_after)
+    upstreams = {"graph": graph, "openai": openai}
+    callbacks: set[asyncio.Task] = set()
+    state = {"client": None}
+
+    def bearer_ok(request: Request) -> bool:
+        return request.headers.get("authorization", "").startswith("Bearer ")
+
+    async def send_status_callbacks(phone_number_id: str, to: str, wamid: str) -> None:
+        if state["client"] is None:
+            state["client"] = httpx.AsyncClient(timeout=10.0)
+        for status in ("sent", "delivered"):
+            await asyncio.sleep(args.callback_delay / 1000)
+            body = {
+                "object": "whatsapp_business_account",
+                "entry": [{"id": "mock-waba", "changes": [{"field": "messages", "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"phone_number_id": phone_number_id},
+                    "statuses": [{"id": wamid, "status": status, "timestamp": str(int(time.time())), "recipient_id": to}],
+                }}]}],
+            }
+            try:
+                await state["client"].post(args.webhook_url, json=body)
+            except httpx.HTTPError:
+                pass
+
+    @app.post("/graph/{version}/{phone_number_id}/messages")
+    async def graph_send(version: str, phone_number_id: str, request: Request):
+        if not bearer_ok(request):
+            graph.counts["unauthorized"] += 1
+            return JSONResponse({"error": {"message": "Invalid OAuth access token.", "type": "OAuthException", "code": 190}}, 401)
+        body = await request.json()
+        outcome = await graph.respond()
+        if outcome == "rate_limited":
+            return JSONResponse(
+                {"error": {"message": "(#130429) Rate limit hit", "type": "OAuthException", "code": 130429}},
+                429,
+                headers={"Retry-After": str(graph.retry_after)},
+            )
+        if outcome == "error":
+            return JSONResponse({"error": {"message": "An unknown error occurred", "type": "OAuthException", "code": 1}}, 500)
+        to = str(body.get("to", ""))
+        wamid = f"wamid.MOCK{uuid.uuid4().hex}"
+        if args.webhook_url:
+            task = asyncio.create_task(send_status_callbacks(phone_number_id, to, wamid))
+            callbacks.add(task)
+            task.add_done_callback(callbacks.discard)
+        return {
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": to, "wa_id": to}],
+            "messages": [{"id": wamid}],
+        }
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        if not bearer_ok(request):
+            openai.counts["unauthorized"] += 1
+            return JSONResponse({"error": {"message": "Missing API key", "type": "invalid_request_error"}}, 401)
+        body = await request.json()
+        outcome = await openai.respond()
+        if outcome == "rate_limited":
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                429,
+                headers={"Retry-After": str(openai.retry_after)},
+            )
+        if outcome == "error":
+            return JSONResponse({"error": {"message": "The server had an error", "type": "server_error"}}, 500)
+        messages = body.get("messages") or [{}]
+        user_text = (messages[-1] or {}).get("content") or ""
+        content = f"Thanks for your message: {user_text[:200]}"
+        return {
+            "id": f"chatcmpl-mock{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(user_text) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(user_text) + len(content)) // 4},
+        }
+
+    @app.get("/_stats")
+    async def stats():
+        return {name: u.stats() for name, u in upstreams.items()} | {"pending_callbacks": len(callbacks)}
+
+    @app.post("/_config")
+    async def configure(request: Request):
+        body = await request.json()
+        try:
+            for name, changes in body.items():
+                upstreams[name].configure(**changes)
+        except (KeyError, ValueError, TypeError) as e:
+            return JSONResponse({"detail": str(e)}, 422)
+        return {name: u.stats() for name, u in upstreams.items()}
+
+    @app.post("/_reset")
+    async def reset():
+        for u in upstreams.values():
+            u.reset()
+        return {"ok": True}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Graph API / OpenAI stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--graph-latency", default="lognormal:40:250")
+    parser.add_argument("--graph-error-rate", type=float, default=0.0, help="Fraction answered with HTTP 500")
+    parser.add_argument("--graph-429-rate", type=float, default=0.0, help="Fraction answered with HTTP 429")
+    parser.add_argument("--openai-latency", default="lognormal:600:3000")
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--openai-429-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429")
+    parser.add_argument("--webhook-url", default="", help="e.g. http://localhost:8000/webhook for status callbacks")
+    parser.add_argument("--callback-delay", type=float, default=200.0, help="Milliseconds before each status callback")
+    args = parser.parse_args()
+    for spec in (args.graph_latency, args.openai_latency):
+        parse_latency(spec)  # Fail fast on typos
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
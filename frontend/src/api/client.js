@@ -48,6 +48,21 @@ export const updateConversationFlow = (data) => api.patch('/api/settings/convers
 // User: notifications
 export const listNotifications = (params) => api.get('/api/notifications', { params })
 export const markNotificationRead = (id) => api.post(`/api/notifications/${id}/read`)
+export const getUnreadNotificationCount = () => api.get('/api/notifications/unread-count')
+// Either { ids: [...] } or { before: isoTimestamp }
+export const markNotificationsRead = (data) => api.post('/api/notifications/read', data)
+
+// User: live events (notification, message, stage, resync) pushed over Server-Sent Events.
+// Returns a function that closes the stream.
+export const subscribeEvents = (handlers) => {
+  const token = localStorage.getItem('token')
+  if (!token || typeof EventSource === 'undefined') return () => {}
+  const source = new EventSource(`${baseURL}/api/events/stream?token=${encodeURIComponent(token)}`)
+  Object.entries(handlers).forEach(([type, fn]) => {
+    source.addEventListener(type, (e) => fn(JSON.parse(e.data)))
+  })
+  return () => source.close()
+}
 
 // User: WhatsApp accounts
 export const listMyWhatsAppAccounts = () => api.get('/api/accounts/whatsapp')
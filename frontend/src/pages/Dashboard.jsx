@@ -1,12 +1,12 @@
 import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
-import { listConversations, listLeads, listMyWhatsAppAccounts, listNotifications } from '../api/client'
+import { listConversations, listLeads, listMyWhatsAppAccounts, getUnreadNotificationCount, subscribeEvents } from '../api/client'
 
 export default function Dashboard() {
   const [conversations, setConversations] = useState([])
   const [leads, setLeads] = useState([])
   const [accounts, setAccounts] = useState([])
-  const [notifications, setNotifications] = useState([])
+  const [unread, setUnread] = useState(0)
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
@@ -14,10 +14,18 @@ export default function Dashboard() {
       listConversations({ limit: 5 }).then((r) => setConversations(r.data)),
       listLeads({ limit: 5 }).then((r) => setLeads(r.data)),
       listMyWhatsAppAccounts().then((r) => setAccounts(r.data)),
-      listNotifications({ limit: 5 }).then((r) => setNotifications(r.data)),
+      getUnreadNotificationCount().then((r) => setUnread(r.data.count)),
     ]).catch(console.error).finally(() => setLoading(false))
   }, [])
 
+  useEffect(() => subscribeEvents({
+    notification: () => setUnread((n) => n + 1),
+    resync: () => getUnreadNotificationCount().then((r) => setUnread(r.data.count)).catch(console.error),
+    stage: (e) => setConversations((prev) => prev.map((c) => (
+      c.id === e.conversation_id ? { ...c, current_stage: e.to } : c
+    ))),
+  }), [])
+
   if (loading) return <div className="text-gray-500">Loading...</div>
 
   return (
@@ -42,7 +50,7 @@ export default function Dashboard() {
         <div className="bg-white dark:bg-gray-800 rounded-xl border border-gray-200 dark:border-gray-700 p-4">
           <p className="text-sm text-gray-500 dark:text-gray-400">Unread notifications</p>
           <p className="text-2xl font-semibold text-primary-600 dark:text-primary-400">
-            {notifications.filter((n) => !n.is_read).length}
+            {unread}
           </p>
           <Link to="/notifications" className="text-sm text-primary-600 hover:underline mt-1 block">View all</Link>
         </div>
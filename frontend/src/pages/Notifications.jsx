@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
-import { listNotifications, markNotificationRead } from '../api/client'
+import { listNotifications, markNotificationRead, markNotificationsRead, subscribeEvents } from '../api/client'
 
 export default function Notifications() {
   const [list, setList] = useState([])
@@ -17,6 +17,11 @@ export default function Notifications() {
 
   useEffect(() => {
     fetchList()
+    // New notifications arrive over the event stream; no polling
+    return subscribeEvents({
+      notification: (n) => setList((prev) => (prev.some((p) => p.id === n.id) ? prev : [n, ...prev])),
+      resync: fetchList,
+    })
   }, [unreadOnly])
 
   const markRead = async (id) => {
@@ -28,19 +33,39 @@ export default function Notifications() {
     }
   }
 
+  const markAllRead = async () => {
+    // Everything up to the newest shown item; anything arriving meanwhile stays unread
+    if (list.length === 0) return
+    try {
+      await markNotificationsRead({ before: list[0].created_at })
+      fetchList()
+    } catch (e) {
+      console.error(e)
+    }
+  }
+
   return (
     <div className="space-y-6">
       <div className="flex items-center justify-between">
         <h1 className="text-2xl font-bold text-gray-900 dark:text-white">Notifications</h1>
-        <label className="flex items-center gap-2 cursor-pointer">
-          <input
-            type="checkbox"
-            checked={unreadOnly}
-            onChange={(e) => setUnreadOnly(e.target.checked)}
-            className="rounded border-gray-300 text-primary-600"
-          />
-          <span className="text-sm text-gray-600 dark:text-gray-400">Unread only</span>
-        </label>
+        <div className="flex items-center gap-4">
+          <button
+            onClick={markAllRead}
+            disabled={!list.some((n) => !n.is_read)}
+            className="text-sm text-primary-600 hover:underline disabled:opacity-50 disabled:no-underline"
+          >
+            Mark all read
+          </button>
+          <label className="flex items-center gap-2 cursor-pointer">
+            <input
+              type="checkbox"
+              checked={unreadOnly}
+              onChange={(e) => setUnreadOnly(e.target.checked)}
+              className="rounded border-gray-300 text-primary-600"
+            />
+            <span className="text-sm text-gray-600 dark:text-gray-400">Unread only</span>
+          </label>
+        </div>
       </div>
 
       <div className="bg-white dark:bg-gray-800 rounded-xl border border-gray-200 dark:border-gray-700 divide-y divide-gray-200 dark:divide-gray-700">